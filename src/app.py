@@ -2,24 +2,31 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import dcc, html, Input, Output, State, callback
 from pages.navbar import CONTENT_STYLE, HEADER_STYLE
-import os
+from pages import compression, datastore, metrics, static_assets, user_index, warmup
+from plotly.io.json import to_json_plotly
 
-#setting the path to call datasets and images 
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-dname = dname.replace("\\", "/")
-os.chdir(dname)
-
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.FONT_AWESOME], use_pages=True, suppress_callback_exceptions=True)
+# once `python -m tools.build_assets` has run, the stylesheets of assets/ are served precompressed from their
+# hashed copies instead of being included by Dash
+built_stylesheets = static_assets.stylesheets()
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.FONT_AWESOME, *built_stylesheets],
+                assets_ignore=r'.*\.css$' if built_stylesheets else '',
+                use_pages=True, suppress_callback_exceptions=True)
 server = app.server
+static_assets.register_routes(server)
+# JSON lookups of the users across the keywords (pages/user_index.py)
+user_index.register_routes(server, datastore.user_index)
+# callback latency histograms, cache counters and stage spans on /metrics (pages/metrics.py)
+metrics.register(server, app.callback_map)
+# gzip/brotli for the callback and layout responses, ETags for the GET ones
+compression.register(server)
 
 # define the navbar
 
 navbar_menu = html.Div(
     [
         html.Div([
-            html.Img(src='assets/twitter_logo.png', alt="Twitter Logo",
-                     style={"width": "2rem", "height": "2rem"}),
+            static_assets.responsive_image('twitter_logo.png', sizes='2rem', alt="Twitter Logo",
+                                           style={"width": "2rem", "height": "2rem"}),
         ], style={"flex": "1"}),
         html.Div([
             dbc.Nav(
@@ -67,5 +74,12 @@ app.layout = dbc.Container(
         ], fluid=True, style=CONTENT_STYLE
         )
 
+# plotly imports its json engine (orjson when installed) on the first serialization, and threads importing it
+# at the same time can get a half initialized module
+to_json_plotly({})
+
+# build the figures of the pages in the background (see pages/warmup.py for the WARM_UP modes)
+warmup.start()
+
 if __name__ == '__main__':
     app.run_server(debug=True)
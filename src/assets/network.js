@@ -0,0 +1,72 @@
+// Relationships page with NETWORK_CLIENTSIDE=1: builds the network figure of a keyword from the compact graph
+// data of the network-data store (create_network_data in pages/page4.py), the same figure as the server one
+// with batched edges. Figures are kept per keyword, switching back to a keyword only swaps them.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    network: {
+        figures: {},
+
+        buildFigure: function (keyword, data) {
+            if (!data || !data.keywords[keyword]) {
+                return window.dash_clientside.no_update;
+            }
+            const graph = data.keywords[keyword];
+            const cached = this.figures[keyword];
+            if (cached && cached.graph === graph) {
+                return cached.figure;
+            }
+
+            // one trace per colour, the segments of the edges separated by null
+            const traces = [];
+            // [agreement, colour] pairs, in the order of the server traces
+            for (const [value, color] of data.colors) {
+                const x = [];
+                const y = [];
+                graph.agreement.forEach(function (agreement, i) {
+                    if (agreement === value) {
+                        const source = graph.source[i];
+                        const target = graph.target[i];
+                        x.push(graph.x[source], graph.x[target], null);
+                        y.push(graph.y[source], graph.y[target], null);
+                    }
+                });
+                if (x.length) {
+                    traces.push({
+                        type: data.webgl ? 'scattergl' : 'scatter',
+                        x: x,
+                        y: y,
+                        line: {width: 0.5, color: color},
+                        hoverinfo: 'none',
+                        mode: 'lines'
+                    });
+                }
+            }
+
+            traces.push({
+                type: 'scatter',
+                x: graph.x,
+                y: graph.y,
+                text: graph.text,
+                customdata: graph.community,
+                mode: 'markers+text',
+                hoverinfo: 'text',
+                marker: {color: graph.color, size: graph.size, line: {width: 2}}
+            });
+
+            const axis = {showgrid: false, zeroline: false, showticklabels: false};
+            const figure = {
+                data: traces,
+                layout: {
+                    title: {text: graph.title},
+                    showlegend: false,
+                    hovermode: 'closest',
+                    margin: {b: 20, l: 5, r: 5, t: 40},
+                    xaxis: axis,
+                    yaxis: axis,
+                    template: data.template
+                }
+            };
+            this.figures[keyword] = {graph: graph, figure: figure};
+            return figure;
+        }
+    }
+});
@@ -0,0 +1,275 @@
+# Load test of the Dash callbacks, called through the Flask test client and /_dash-update-component as the
+# browser would call them.
+# Run from the src folder:
+#   python -m benchmarks.bench_callbacks [--concurrency 1 4 16] [--requests 50] [--scenarios network drilldown]
+#                                        [--encoding gzip] [--json out.json] [--compare previous.json]
+#
+# Every scenario is a callback request, for every keyword of the data folder when it depends on the keyword:
+#   layout              the layout of every page, rendered by the pages router (/, /page2, /page3, /page4)
+#   network             update_graph of the Relationships page, whole period
+#   network-window      update_graph for the first week of the keyword
+#   time-window         the range slider of the keyword
+#   window-percentiles  the edge betweenness percentiles of the first week
+#   drilldown           the drill-down of the community with the most posts
+#   faq                 the FAQ toggle of the Polarization page
+#   user-search         the search box of the Relationships page, for the first two letters of the busiest user
+# Scenarios whose callback is not registered (e.g. the time window, or the clientside figure with
+# NETWORK_CLIENTSIDE=1) are skipped. The bodies are built from the registered callbacks, so they follow
+# NETWORK_EDGE_MODE and the other settings.
+#
+# At every concurrency, --requests calls of each scenario are split between that many threads (each with its own
+# test client) after one call to fill the caches. Reported: p50/p90/p95/p99/max latency, throughput, response
+# bytes and the peak resident memory of the process during the scenario (VmHWM, reset before each scenario through
+# /proc/self/clear_refs on Linux). --compare flags the p50/p95 that got slower than a previous --json run by more
+# than --tolerance.
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SCENARIOS = ['layout', 'network', 'network-window', 'time-window', 'window-percentiles', 'drilldown', 'faq',
+             'user-search']
+PAGES = ['/', '/page2', '/page3', '/page4']
+PERCENTILES = [50, 90, 95, 99]
+
+
+def callback_outputs(output):
+    # [(id, property)] of the outputs of a callback, from its key in the callback map
+    if output.startswith('..'):
+        return [tuple(part.rsplit('.', 1)) for part in output[2:-2].split('...')]
+    return [tuple(output.rsplit('.', 1))]
+
+
+def find_callback(callback_map, component_id, prop):
+    # clientside callbacks are in the map too, without a function to call on the server
+    for output, spec in callback_map.items():
+        if 'callback' in spec and (component_id, prop) in callback_outputs(output):
+            return output, spec
+    return None, None
+
+
+def callback_body(callback_map, component_id, prop, values, changed):
+    # request body of the callback with that output, values by 'id.property' (None for the others)
+    output, spec = find_callback(callback_map, component_id, prop)
+    if output is None:
+        return None
+    outputs = [{'id': i, 'property': p} for i, p in callback_outputs(output)]
+
+    def fill(dependencies):
+        return [{**dependency, 'value': values.get(f"{dependency['id']}.{dependency['property']}")}
+                for dependency in dependencies]
+
+    body = {
+        'output': output,
+        'outputs': outputs if output.startswith('..') else outputs[0],
+        'inputs': fill(spec['inputs']),
+        'changedPropIds': [changed],
+    }
+    if spec['state']:
+        body['state'] = fill(spec['state'])
+    return body
+
+
+def first_week(keyword):
+    from pages import datastore
+    from pages.time_index import day_range
+    first, last = day_range(datastore.community_time_index(keyword))
+    # the whole period for a keyword without dated posts, its slider is disabled
+    return None if first is None else [first, min(first + 6, last)]
+
+
+def largest_community(keyword):
+    from pages import datastore
+    index = datastore.community_row_index(keyword)
+    sizes = np.diff(index['community_offsets'])
+    return int(index['community_ids'][int(np.argmax(sizes))])
+
+
+def busiest_user():
+    from pages import datastore
+    index = datastore.user_index()
+    posts = np.add.reduceat(index['entry_posts'], index['user_offsets'][:-1])
+    return str(index['users'][int(np.argmax(posts))])
+
+
+def scenario_requests(name, keywords, callback_map):
+    # [(label, body)] of a scenario
+    requests = []
+    if name == 'layout':
+        for path in PAGES:
+            body = callback_body(callback_map, '_pages_content', 'children',
+                                 {'_pages_location.pathname': path, '_pages_location.search': ''},
+                                 '_pages_location.pathname')
+            requests.append((path, body))
+    elif name == 'faq':
+        requests.append(('faq', callback_body(callback_map, 'faq_collapse', 'is_open',
+                                              {'faq_toggle.n_clicks': 1, 'faq_collapse.is_open': False},
+                                              'faq_toggle.n_clicks')))
+    elif name == 'user-search':
+        prefix = busiest_user()[:2]
+        requests.append((prefix, callback_body(callback_map, 'user-search-results', 'children',
+                                               {'user-search.value': prefix}, 'user-search.value')))
+    else:
+        for keyword in keywords:
+            values = {'keyword-dropdown.value': keyword}
+            if name == 'network':
+                body = callback_body(callback_map, 'network-graph', 'figure', values, 'keyword-dropdown.value')
+            elif name == 'network-window':
+                values['time-window.value'] = first_week(keyword)
+                body = callback_body(callback_map, 'network-graph', 'figure', values, 'time-window.value')
+            elif name == 'time-window':
+                body = callback_body(callback_map, 'time-window', 'value', values, 'keyword-dropdown.value')
+            elif name == 'window-percentiles':
+                values['time-window.value'] = first_week(keyword)
+                body = callback_body(callback_map, 'window-percentiles', 'figure', values, 'time-window.value')
+            else:
+                values['network-graph.clickData'] = {'points': [{'customdata': largest_community(keyword)}]}
+                body = callback_body(callback_map, 'community-drilldown', 'children', values,
+                                     'network-graph.clickData')
+            requests.append((keyword, body))
+    return [(label, body) for label, body in requests if body is not None]
+
+
+def peak_memory():
+    # peak resident MiB of the process since the last reset_peak_memory
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def reset_peak_memory():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        # never reset: the peak of the whole run so far
+        pass
+
+
+def load(server, body, headers, requests, concurrency):
+    local = threading.local()
+
+    def call(_):
+        if not hasattr(local, 'client'):
+            local.client = server.test_client()
+        start = time.perf_counter()
+        response = local.client.post('/_dash-update-component', json=body, headers=headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"{body['output']}: HTTP {response.status_code} {response.data[:200]!r}")
+        return elapsed, len(response.data)
+
+    call(None)
+    reset_peak_memory()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, range(requests)))
+    wall = time.perf_counter() - start
+    timings = np.array([timing for timing, _ in results])
+    result = {f'p{p}_ms': float(np.percentile(timings, p)) for p in PERCENTILES}
+    result.update({
+        'max_ms': float(timings.max()),
+        'mean_ms': float(timings.mean()),
+        'requests_per_s': requests / wall,
+        'bytes': int(np.median([size for _, size in results])),
+        'peak_rss_mib': peak_memory(),
+    })
+    return result
+
+
+def compare(results, previous, tolerance):
+    # (key, metric, before, after) of the latencies that got slower by more than tolerance
+    regressions = []
+    for key, result in results.items():
+        before = previous.get('results', {}).get(key)
+        if not before:
+            continue
+        for metric in ['p50_ms', 'p95_ms']:
+            if result[metric] > before[metric] * (1 + tolerance):
+                regressions.append((key, metric, before[metric], result[metric]))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=50, help='calls per scenario, keyword and concurrency')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--keywords', nargs='+', help='the keywords of the data folder by default')
+    parser.add_argument('--encoding', default='identity', help='Accept-Encoding of the requests (gzip, br)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results of a previous run (--json) to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown reported as a regression')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    import app
+    from pages import datastore, warmup
+    warmup.wait()
+    startup_s = time.perf_counter() - start
+    keywords = args.keywords or datastore.community_keywords()
+    headers = {'Accept-Encoding': args.encoding}
+    # the pages router and the page callbacks are moved to the callback map of the app on the first request
+    app.server.test_client().get('/')
+
+    results = {}
+    print(f"{'scenario':<20}{'request':<14}{'conc':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}"
+          f"{'bytes':>10}{'peak MiB':>9}")
+    for name in args.scenarios:
+        requests = scenario_requests(name, keywords, app.app.callback_map)
+        if not requests:
+            print(f"{name:<20}skipped, its callback is not registered")
+        for label, body in requests:
+            for concurrency in args.concurrency:
+                result = results[f'{name}/{label}/{concurrency}'] = load(app.server, body, headers, args.requests,
+                                                                         concurrency)
+                print(f"{name:<20}{label:<14}{concurrency:>5}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                      f"{result['p99_ms']:>9.2f}{result['requests_per_s']:>8.1f}{result['bytes']:>10}"
+                      f"{result['peak_rss_mib']:>9.1f}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'startup_s': startup_s,
+            'requests': args.requests,
+            'encoding': args.encoding,
+            'settings': {name: value for name, value in os.environ.items()
+                         if name.startswith(('NETWORK_', 'USE_DATA_', 'DATA_'))},
+        },
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for key, metric, before, after in regressions:
+            print(f"regression {key} {metric}: {before:.2f} -> {after:.2f} ms")
+        if not regressions:
+            print(f"no latency more than {args.tolerance:.0%} above {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
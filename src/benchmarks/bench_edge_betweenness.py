@@ -0,0 +1,54 @@
+# Time the edge betweenness modes over growing graphs.
+# Run from the src folder: python -m benchmarks.bench_edge_betweenness [--nodes 250 500 1000 2000] [--workers 4]
+#
+# The graphs are directed scale-free graphs, closer to reply networks than uniform random ones. The
+# approximate mode is compared to the exact one with the mean relative error over the top 1% edges (those
+# that stand out on the Polarization page) and the overlap of the two top 1% sets.
+import argparse
+import time
+
+import networkx as nx
+import numpy as np
+
+from tools.edge_betweenness import edge_betweenness
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def top_edges(betweenness, share=0.01):
+    count = max(1, int(len(betweenness) * share))
+    return sorted(betweenness, key=betweenness.get, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, nargs='*', default=[250, 500, 1000, 2000])
+    parser.add_argument('-k', type=int, default=100, help='sampled sources of the approximate modes')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>7}{'edges':>8}{'exact s':>10}{'parallel s':>12}{'approx s':>10}"
+          f"{'approx err':>12}{'top overlap':>13}")
+    for nodes in args.nodes:
+        G = nx.DiGraph(nx.scale_free_graph(nodes, seed=42))
+        G.remove_edges_from(nx.selfloop_edges(G))
+
+        exact, exact_s = timed(lambda: edge_betweenness(G, 'exact'))
+        parallel, parallel_s = timed(lambda: edge_betweenness(G, 'parallel', workers=args.workers))
+        approximate, approximate_s = timed(lambda: edge_betweenness(G, 'approximate', k=args.k))
+
+        assert max(abs(exact[edge] - parallel[edge]) for edge in exact) < 1e-9
+
+        top = top_edges(exact)
+        error = np.mean([abs(approximate[edge] - exact[edge]) / exact[edge] for edge in top])
+        overlap = len(set(top) & set(top_edges(approximate))) / len(top)
+        print(f"{nodes:>7}{G.number_of_edges():>8}{exact_s:>10.2f}{parallel_s:>12.2f}{approximate_s:>10.2f}"
+              f"{error:>12.1%}{overlap:>13.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# Memory and latency of the community edge tables as the dataset grows (Linux only).
+# Run from the src folder: python -m benchmarks.bench_edge_tables [--rows 10000 100000 1000000] [--json out.json]
+#
+# Writes a synthetic community_<keyword>.csv with the columns of the real ones (tweet text, urls, original
+# content, ...) for every size, then loads it in a new process in three ways:
+#   csv, all columns    pd.read_csv of the whole file, what the Relationships page used to do
+#   csv, used columns   datastore without artifacts: the used columns only, usernames as codes
+#   artifacts           datastore with the artifacts of tools.build_artifacts, memory-mapped
+# and reports the load time, the bytes of the table, the private and resident memory of the process after
+# loading (/proc/self/smaps_rollup, memory-mapped pages are resident but shared, not private) and the median time
+# to get the posts of one community.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+KEYWORD = 'synthetic'
+CONFIGURATIONS = ['csv, all columns', 'csv, used columns', 'artifacts']
+COLUMNS = ['url', 'datetime', 'tweet_Id', 'conversation_ID', 'text', 'username', 'displayname', 'reply_count',
+           'retweet_count', 'quote_count', 'retweeted_tweet', 'quoted_tweet', 'mentioned_users',
+           'originalTweetContent', 'originalUsernamePost', 'agreement', 'TopKeyword', 'SourceModularity',
+           'TargetModularity', 'edge_bet']
+WORDS = ('the vote election fraud georgia runoff trump biden senate capitol count ballots stop steal we have to '
+         'america people democrats republicans state court law rigged win lost again never').split()
+
+
+def write_csv(path, rows, communities, seed=42):
+    rng = np.random.default_rng(seed)
+    users = max(rows // 5, 10)
+    # a few thousand different texts, every row gets its own string object once parsed
+    texts = np.array([' '.join(rng.choice(WORDS, rng.integers(8, 40))) for _ in range(2000)])
+    repliers = rng.integers(0, users, rows)
+    posters = rng.zipf(1.5, rows) % users
+    source = rng.integers(0, communities, rows)
+    target = (source + rng.integers(1, communities, rows)) % communities
+    tweet_ids = rng.integers(10 ** 18, 2 * 10 ** 18, rows)
+    pd.DataFrame({
+        'url': [f'https://twitter.com/user{u}/status/{t}' for u, t in zip(repliers, tweet_ids)],
+        'datetime': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 86400 * 30, rows), unit='s'),
+        'tweet_Id': tweet_ids,
+        'conversation_ID': rng.integers(10 ** 18, 2 * 10 ** 18, rows),
+        'text': texts[rng.integers(0, len(texts), rows)],
+        'username': [f'user{u}' for u in repliers],
+        'displayname': [f'User {u}' for u in repliers],
+        'reply_count': rng.integers(0, 10, rows),
+        'retweet_count': rng.integers(0, 10, rows),
+        'quote_count': rng.integers(0, 10, rows),
+        'retweeted_tweet': np.nan,
+        'quoted_tweet': '',
+        'mentioned_users': [f'https://twitter.com/user{p}' for p in posters],
+        'originalTweetContent': texts[rng.integers(0, len(texts), rows)],
+        'originalUsernamePost': [f'user{p}' for p in posters],
+        'agreement': rng.choice([-1, 1], rows),
+        'TopKeyword': KEYWORD,
+        'SourceModularity': source,
+        'TargetModularity': target,
+        'edge_bet': rng.exponential(5e-6, rows),
+    })[COLUMNS].to_csv(path, index=False)
+
+
+def child(configuration, communities):
+    from benchmarks.bench_memory import memory
+    from pages import datastore
+
+    before = memory(os.getpid())
+    start = time.perf_counter()
+    if configuration == 'csv, all columns':
+        df = pd.read_csv(datastore.community_csv(KEYWORD))
+        table_bytes = int(df.memory_usage(deep=True).sum())
+
+        def posts(community):
+            return df[(df['SourceModularity'] == community) | (df['TargetModularity'] == community)]
+    else:
+        arrays = datastore.community_arrays(KEYWORD)
+        datastore.load_community(KEYWORD)
+        datastore.community_row_index(KEYWORD)
+        table_bytes = int(sum(values.nbytes for values in arrays.values()))
+
+        def posts(community):
+            return datastore.community_posts(KEYWORD, community)
+    load = time.perf_counter() - start
+    after = memory(os.getpid())
+
+    timings = []
+    for community in range(min(communities, 20)):
+        start = time.perf_counter()
+        posts(community)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(json.dumps({
+        'load_s': load,
+        'table_mib': table_bytes / 2 ** 20,
+        'private_mib': after['private'] - before['private'],
+        'rss_mib': after['rss'] - before['rss'],
+        'posts_ms': float(np.median(timings)),
+    }))
+
+
+def run(configuration, folder, communities):
+    env = {**os.environ, 'DATA_ROOT': folder, 'DATA_ARTIFACTS_DIR': os.path.join(folder, 'artifacts'),
+           'USE_DATA_ARTIFACTS': '1' if configuration == 'artifacts' else '0'}
+    command = [sys.executable, '-m', 'benchmarks.bench_edge_tables', '--child', configuration,
+               '--communities', str(communities)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--communities', type=int, default=200)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.communities)
+
+    results = {}
+    print(f"{'rows':>9}  {'configuration':<19}{'csv MiB':>8}{'load s':>8}{'table MiB':>10}{'private MiB':>12}"
+          f"{'rss MiB':>8}{'posts ms':>9}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, f'community_{KEYWORD}.csv')
+            write_csv(path, rows, args.communities)
+            csv_mib = os.path.getsize(path) / 2 ** 20
+            env = {**os.environ, 'DATA_ROOT': folder, 'DATA_ARTIFACTS_DIR': os.path.join(folder, 'artifacts')}
+            subprocess.run([sys.executable, '-m', 'tools.build_artifacts', '--skip-kruskal', KEYWORD], env=env,
+                           capture_output=True, check=True)
+
+            for configuration in CONFIGURATIONS:
+                result = results[f'{rows}/{configuration}'] = run(configuration, folder, args.communities)
+                print(f"{rows:>9}  {configuration:<19}{csv_mib:>8.1f}{result['load_s']:>8.2f}"
+                      f"{result['table_mib']:>10.1f}{result['private_mib']:>12.1f}{result['rss_mib']:>8.1f}"
+                      f"{result['posts_ms']:>9.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
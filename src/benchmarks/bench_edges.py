@@ -0,0 +1,78 @@
+# Compare the edge rendering modes of the Relationships page.
+# Run from the src folder: python -m benchmarks.bench_edges [--repeat 5] [--html out_dir]
+#
+# For every keyword and edge mode it reports the number of traces, the size of the figure JSON,
+# the time to build the figure and the time to serialize it. With --html it also writes a page per
+# keyword and mode that logs the time Plotly.newPlot takes in the browser console.
+import argparse
+import os
+import statistics
+import time
+
+import app  # noqa: F401  (pages can only be imported once the Dash app exists)
+from pages import datastore
+from pages.page4 import create_network_graph
+
+MODES = ['per_edge', 'batched', 'webgl']
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html><head><script src="https://cdn.plot.ly/plotly-2.18.0.min.js"></script></head>
+<body><div id="graph" style="height:800px"></div>
+<script>
+var figure = {figure};
+var start = performance.now();
+Plotly.newPlot('graph', figure.data, figure.layout).then(function () {{
+    var elapsed = performance.now() - start;
+    console.log('render ms', elapsed);
+    document.title = 'render ' + elapsed.toFixed(1) + ' ms';
+}});
+</script></body></html>
+"""
+
+
+def measure(keyword, df, mode, repeat):
+    build_times, serialize_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = create_network_graph(keyword, df, edge_mode=mode)
+        build_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        payload = fig.to_json()
+        serialize_times.append(time.perf_counter() - start)
+
+    return {
+        'traces': len(fig.data),
+        'bytes': len(payload.encode()),
+        'build_ms': statistics.median(build_times) * 1000,
+        'serialize_ms': statistics.median(serialize_times) * 1000,
+        'payload': payload,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--html', help='folder where browser render pages are written')
+    args = parser.parse_args()
+
+    print(f"{'keyword':<14}{'mode':<10}{'traces':>8}{'bytes':>10}{'build ms':>10}{'json ms':>10}")
+    for keyword in sorted(datastore.community_keywords()):
+        df = datastore.load_community(keyword)
+        baseline = None
+        for mode in MODES:
+            result = measure(keyword, df, mode, args.repeat)
+            baseline = baseline or result
+            print(f"{keyword:<14}{mode:<10}{result['traces']:>8}{result['bytes']:>10}"
+                  f"{result['build_ms']:>10.1f}{result['serialize_ms']:>10.1f}"
+                  f"  ({result['bytes'] / baseline['bytes']:.0%} of per_edge bytes)")
+
+            if args.html:
+                os.makedirs(args.html, exist_ok=True)
+                path = os.path.join(args.html, f"{keyword.replace(' ', '_')}-{mode}.html")
+                with open(path, 'w') as f:
+                    f.write(HTML_TEMPLATE.format(figure=result['payload']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Time the layout engines against nx.spring_layout over growing graphs.
+# Run from the src folder: python -m benchmarks.bench_layout [--nodes 100 500 1000 2000 4000]
+#
+# For each scale-free graph it times:
+#   spring  nx.spring_layout(G, seed=42), which needs scipy from 500 nodes on
+#   numpy   force_layout from a random start, same forces and number of iterations
+#   warm    compute_layout after adding 1% new nodes and edges, starting from the numpy positions
+# and reports how far the nodes move (mean distance, layouts span [-1, 1]) when the changed graph is laid out
+# again from scratch and when it is warm started. The community graphs of the keywords are timed first.
+import argparse
+import time
+
+import networkx as nx
+import numpy as np
+
+from pages import datastore
+from pages.layout import compute_layout, force_layout
+from pages.network import build_community_graph
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def spring(G):
+    try:
+        return timed(lambda: nx.spring_layout(G, seed=42))
+    except ImportError:
+        return None, None
+
+
+def movement(before, after):
+    nodes = [node for node in before if node in after]
+    return np.mean([np.linalg.norm(np.asarray(before[node]) - after[node]) for node in nodes])
+
+
+def grow(G, share, seed):
+    # a copy of G with `share` new nodes, each linked to an existing node, and as many new edges
+    rng = np.random.default_rng(seed)
+    G = G.copy()
+    nodes = list(G)
+    count = max(1, int(len(nodes) * share))
+    for i in range(count):
+        G.add_edge(f'new{i}', nodes[rng.integers(len(nodes))])
+        u, v = rng.choice(len(nodes), 2, replace=False)
+        G.add_edge(nodes[u], nodes[v])
+    return G
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, nargs='*', default=[100, 500, 1000, 2000, 4000])
+    args = parser.parse_args()
+
+    print(f"{'graph':<16}{'nodes':>7}{'edges':>8}{'spring s':>10}{'numpy s':>10}{'warm s':>10}"
+          f"{'cold move':>11}{'warm move':>11}")
+
+    def report(name, G):
+        _, spring_s = spring(G)
+        pos, numpy_s = timed(lambda: force_layout(G))
+        changed = grow(G, 0.01, seed=0)
+        cold = force_layout(changed, seed=1)
+        warm, warm_s = timed(lambda: compute_layout(changed, pos))
+        spring_text = f"{spring_s:>10.2f}" if spring_s is not None else f"{'no scipy':>10}"
+        print(f"{name:<16}{len(G):>7}{G.number_of_edges():>8}{spring_text}{numpy_s:>10.2f}{warm_s:>10.2f}"
+              f"{movement(pos, cold):>11.3f}{movement(pos, warm):>11.3f}")
+
+    for keyword in datastore.community_keywords():
+        report(keyword, build_community_graph(datastore.load_community(keyword)))
+    for nodes in args.nodes:
+        report('scale-free', nx.Graph(nx.barabasi_albert_graph(nodes, 2, seed=42)))
+
+
+if __name__ == '__main__':
+    main()
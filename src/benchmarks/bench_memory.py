@@ -0,0 +1,132 @@
+# Measure the resident memory of the gunicorn workers (Linux only).
+# Run from the src folder: python -m benchmarks.bench_memory [--workers 4]
+#
+# Starts gunicorn with and without preload_app / data artifacts, sends every page and every keyword of the
+# Relationships page to each worker so that all datasets are loaded, then reads /proc/<pid>/smaps_rollup:
+# Rss counts shared pages in full, Pss splits them between the processes sharing them and Private is what
+# the worker alone owns.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from pages import datastore
+
+CONFIGURATIONS = [
+    ('csv, no preload', {'GUNICORN_PRELOAD': '0', 'USE_DATA_ARTIFACTS': '0'}),
+    ('csv, preload', {'GUNICORN_PRELOAD': '1', 'USE_DATA_ARTIFACTS': '0'}),
+    ('artifacts, no preload', {'GUNICORN_PRELOAD': '0', 'USE_DATA_ARTIFACTS': '1'}),
+    ('artifacts, preload', {'GUNICORN_PRELOAD': '1', 'USE_DATA_ARTIFACTS': '1'}),
+]
+
+
+def memory(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0].endswith(':') and len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'private': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    return urllib.request.urlopen(request).read()
+
+
+def load_everything(base_url):
+    for path in ['/', '/page2', '/page3', '/page4', '/_dash-layout', '/_dash-dependencies']:
+        urllib.request.urlopen(base_url + path).read()
+    for keyword in datastore.community_keywords():
+        post(base_url + '/_dash-update-component', {
+            'output': 'network-graph.figure',
+            'outputs': {'id': 'network-graph', 'property': 'figure'},
+            'inputs': [{'id': 'keyword-dropdown', 'property': 'value', 'value': keyword},
+                       {'id': 'time-window', 'property': 'value', 'value': None}],
+            'changedPropIds': ['keyword-dropdown.value'],
+        })
+    for path in ['/page2', '/page3', '/page4']:
+        post(base_url + '/_dash-update-component', {
+            'output': '.._pages_content.children..._pages_store.data..',
+            'outputs': [{'id': '_pages_content', 'property': 'children'},
+                        {'id': '_pages_store', 'property': 'data'}],
+            'inputs': [{'id': '_pages_location', 'property': 'pathname', 'value': path},
+                       {'id': '_pages_location', 'property': 'search', 'value': ''}],
+            'changedPropIds': ['_pages_location.pathname'],
+        })
+
+
+def run(name, env, workers, port, rounds):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+         'app:server'],
+        env={**os.environ, **env, 'WEB_CONCURRENCY': str(workers)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(120):
+            try:
+                urllib.request.urlopen(base_url + '/').read()
+                break
+            except OSError:
+                time.sleep(0.5)
+
+        # sync workers take one request at a time, enough rounds reach every worker
+        for _ in range(rounds * workers):
+            load_everything(base_url)
+
+        pids = children(process.pid)
+        per_worker = [memory(pid) for pid in pids]
+        result = {
+            'configuration': name,
+            'workers': len(pids),
+            'master': memory(process.pid),
+            'worker_rss': sum(m['rss'] for m in per_worker) / len(per_worker),
+            'worker_pss': sum(m['pss'] for m in per_worker) / len(per_worker),
+            'worker_private': sum(m['private'] for m in per_worker) / len(per_worker),
+        }
+        result['total_pss'] = result['master']['pss'] + sum(m['pss'] for m in per_worker)
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'configuration':<24}{'rss MiB':>10}{'pss MiB':>10}{'private MiB':>13}{'total pss MiB':>15}")
+    for name, env in CONFIGURATIONS:
+        result = run(name, env, args.workers, args.port, args.rounds)
+        results.append(result)
+        print(f"{name:<24}{result['worker_rss']:>10.1f}{result['worker_pss']:>10.1f}"
+              f"{result['worker_private']:>13.1f}{result['total_pss']:>15.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
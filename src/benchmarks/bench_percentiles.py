@@ -0,0 +1,66 @@
+# Accuracy and speed of the percentile engine against np.percentile.
+# Run from the src folder: python -m benchmarks.bench_percentiles [--sizes 100000 1000000 10000000]
+#
+# For the real edge betweenness of every keyword and agreement class, and for synthetic log-normal samples of
+# growing size, it times:
+#   numpy   np.percentile over the full 80-100 grid, as the page used to do
+#   sorted  SortedSample keeping only the plotted tail: one partition, a sort of the tail and the query
+#   query   a new grid answered from an already sorted sample
+# and reports the largest relative error of the sorted tail compared to np.percentile. The run fails when
+# SortedSample differs from np.percentile in any value.
+import argparse
+import time
+
+import numpy as np
+
+from pages import datastore
+from pages.percentiles import SortedSample
+
+GRID = np.linspace(80, 100, 500)
+PLOTTED = GRID[450:]
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def compare(name, values):
+    expected, numpy_ms = timed(lambda: np.percentile(values, GRID))
+
+    tail, sort_ms = timed(lambda: SortedSample(values, PLOTTED[0]))
+    plotted, sorted_ms = timed(lambda: tail.percentile(PLOTTED))
+    sorted_ms += sort_ms
+
+    sample = SortedSample(values)
+    queried, query_ms = timed(lambda: sample.percentile(GRID))
+
+    scale = np.where(expected[450:] == 0, 1, np.abs(expected[450:]))
+    sorted_error = np.abs(plotted - expected[450:]).max() / scale.max()
+
+    print(f"{name:<28}{len(values):>10}{numpy_ms:>10.2f}{sorted_ms:>10.2f}{query_ms:>10.3f}"
+          f"{sorted_error:>12.1e}")
+    assert np.array_equal(plotted, expected[450:]), f'{name}: sorted tail differs from np.percentile'
+    assert np.array_equal(queried, expected), f'{name}: sorted query differs from np.percentile'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='*', default=[100_000, 1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    print(f"{'sample':<28}{'n':>10}{'numpy ms':>10}{'sorted ms':>10}{'query ms':>10}"
+          f"{'sorted err':>12}")
+    for keyword, arrays in datastore.kruskal_arrays().items():
+        for agreement, label in [(1, 'agreement'), (-1, 'disagreement')]:
+            values = np.asarray(arrays['edge_bet'][arrays['agreement'] == agreement])
+            compare(f'{keyword} {label}', values)
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        compare('log-normal', rng.lognormal(-12, 1.5, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Bytes on the wire and latency of the Relationships figure callback, per keyword.
+# Run from the src folder: python -m benchmarks.bench_responses [--requests 50] [--precision 3] [--json out.json]
+#
+# Every configuration runs in a new process (the coordinate precision is read at import) with the figures
+# already built, so the numbers are those of the callback itself:
+#   identity         full floats, no compression (the responses before compression was added)
+#   rounded          coordinates rounded to --precision decimals, no compression
+#   gzip / br        full floats, compressed
+#   rounded + gzip   both
+# For each one it prints the response size and the median and p95 latency of --requests calls per keyword.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def child(requests, encoding):
+    import app
+    from pages import datastore, warmup
+    warmup.wait()
+
+    client = app.server.test_client()
+    client.get('/')
+    results = {}
+    for keyword in datastore.community_keywords():
+        body = {
+            'output': 'network-graph.figure',
+            'outputs': {'id': 'network-graph', 'property': 'figure'},
+            'inputs': [{'id': 'keyword-dropdown', 'property': 'value', 'value': keyword},
+                       {'id': 'time-window', 'property': 'value', 'value': None}],
+            'changedPropIds': ['keyword-dropdown.value'],
+        }
+        headers = {'Accept-Encoding': encoding} if encoding else {}
+        timings = []
+        for _ in range(requests + 1):
+            start = time.perf_counter()
+            response = client.post('/_dash-update-component', json=body, headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[keyword] = {
+            'bytes': len(response.data),
+            'encoding': response.headers.get('Content-Encoding', 'identity'),
+            # the first call fills the compression cache
+            'p50_ms': float(np.percentile(timings[1:], 50)),
+            'p95_ms': float(np.percentile(timings[1:], 95)),
+        }
+    print(json.dumps(results))
+
+
+def run(requests, encoding, precision):
+    env = {**os.environ, 'NETWORK_COORDINATE_PRECISION': str(precision) if precision is not None else ''}
+    command = [sys.executable, '-m', 'benchmarks.bench_responses', '--child', '--requests', str(requests)]
+    if encoding:
+        command += ['--encoding', encoding]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--precision', type=int, default=3)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--encoding', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.requests, args.encoding)
+
+    from pages.compression import brotli
+    configurations = [('identity', None, None), ('rounded', None, args.precision), ('gzip', 'gzip', None)]
+    if brotli is not None:
+        configurations.append(('br', 'br', None))
+    configurations.append(('rounded + gzip', 'gzip', args.precision))
+    if brotli is not None:
+        configurations.append(('rounded + br', 'br', args.precision))
+
+    results = {}
+    print(f"{'configuration':<16}{'keyword':<14}{'bytes':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, encoding, precision in configurations:
+        results[name] = run(args.requests, encoding, precision)
+        for keyword, result in results[name].items():
+            print(f"{name:<16}{keyword:<14}{result['bytes']:>9}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
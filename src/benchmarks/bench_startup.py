@@ -0,0 +1,93 @@
+# Time from a fresh python process to the first responses of the app, for every WARM_UP mode.
+# Run from the src folder: python -m benchmarks.bench_startup [--repeat 5] [--json startup.json]
+#
+# Every run is a new process (what a new gunicorn worker without preload goes through) that measures:
+#   import    import app, which executes every page module
+#   home      import plus the first homepage request (index html and the page router callback)
+#   network   the first Relationships figure after that
+#   warm      when the warm-up has built every figure
+# with the figure cache on disk empty (cold) and filled by the previous runs (disk). The medians are printed
+# and, with --json, written to a file so that they can be compared between commits.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ['eager', 'background', 'lazy']
+
+
+def child():
+    start = time.perf_counter()
+    import app
+    from pages import datastore, warmup
+    timings = {'import': time.perf_counter() - start}
+
+    client = app.server.test_client()
+    client.get('/')
+    client.post('/_dash-update-component', json={
+        'output': '.._pages_content.children..._pages_store.data..',
+        'outputs': [{'id': '_pages_content', 'property': 'children'}, {'id': '_pages_store', 'property': 'data'}],
+        'inputs': [{'id': '_pages_location', 'property': 'pathname', 'value': '/'},
+                   {'id': '_pages_location', 'property': 'search', 'value': ''}],
+        'changedPropIds': ['_pages_location.pathname'],
+    })
+    timings['home'] = time.perf_counter() - start
+
+    client.post('/_dash-update-component', json={
+        'output': 'network-graph.figure',
+        'outputs': {'id': 'network-graph', 'property': 'figure'},
+        'inputs': [{'id': 'keyword-dropdown', 'property': 'value', 'value': datastore.community_keywords()[0]},
+                   {'id': 'time-window', 'property': 'value', 'value': None}],
+        'changedPropIds': ['keyword-dropdown.value'],
+    })
+    timings['network'] = time.perf_counter() - start
+
+    warmup.wait()
+    timings['warm'] = time.perf_counter() - start
+    print(json.dumps(timings))
+
+
+def run(mode, cache_dir):
+    env = {**os.environ, 'WARM_UP': mode, 'FIGURE_CACHE_DIR': cache_dir}
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child'], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='write the medians to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child()
+
+    results = {}
+    print(f"{'mode':<12}{'cache':<7}{'import s':>10}{'home s':>10}{'network s':>11}{'warm s':>10}")
+    for mode in MODES:
+        for cache in ['cold', 'disk']:
+            runs = []
+            for _ in range(args.repeat):
+                with tempfile.TemporaryDirectory() as cold_dir:
+                    # the disk runs share one folder, filled by a first untimed run
+                    cache_dir = cold_dir if cache == 'cold' else os.path.join(tempfile.gettempdir(), 'bench-startup')
+                    if cache == 'disk' and not os.path.exists(cache_dir):
+                        run(mode, cache_dir)
+                    runs.append(run(mode, cache_dir))
+            medians = {name: statistics.median(r[name] for r in runs) for name in runs[0]}
+            results[f'{mode}/{cache}'] = medians
+            print(f"{mode:<12}{cache:<7}{medians['import']:>10.2f}{medians['home']:>10.2f}"
+                  f"{medians['network']:>11.2f}{medians['warm']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import os
+
+# gunicorn settings, used with: gunicorn --chdir src --config src/gunicorn.conf.py app:server
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threaded workers: the pages resolve their files from pages/paths.py and share their caches behind locks,
+# so several callbacks can run at once in the same worker. GUNICORN_WORKER_CLASS=sync goes back to one
+# request per process (gunicorn turns sync into gthread when threads > 1).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+
+# Import the app once in the master and fork the workers from it: the modules, the cached figures and the
+# memory-mapped datasets are then shared copy-on-write instead of being loaded again by every worker.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    if preload_app:
+        from pages import datastore, warmup
+        datastore.preload()
+        # fork the workers once the figures are built, so that they share them
+        warmup.wait()
+
+
+def post_worker_init(worker):
+    # Dash copies the callbacks of the pages into the app on the first request and marks that done before the
+    # copy: with threaded workers the requests arriving meanwhile would not find their callback. One request
+    # through the test client, before the worker accepts connections, does the copy.
+    from app import app
+    app.server.test_client().get(app.get_relative_path('/_dash-dependencies'))
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+def build_community_index(df):
+    # Summarise every modularity class of a keyword in one pass over the rows.
+    # A row belongs to the class of its source and to the class of its target, so the two columns
+    # are melted into one and each user is counted once per row and class (as a filter on
+    # SourceModularity | TargetModularity would do).
+    rows = df[['originalUsernamePost', 'SourceModularity', 'TargetModularity']].reset_index(drop=True)
+    rows['row'] = np.arange(len(rows))
+
+    melted = rows.melt(
+        id_vars=['row', 'originalUsernamePost'],
+        value_vars=['SourceModularity', 'TargetModularity'],
+        value_name='modularity_class',
+    ).drop_duplicates(['row', 'modularity_class'])
+
+    # Count the posts of every user in every class, ties go to the user that shows up first
+    counts = (
+        melted.groupby(['modularity_class', 'originalUsernamePost'], sort=False, observed=True)
+        .agg(posts=('row', 'size'), first_row=('row', 'min'))
+        .reset_index()
+        .sort_values(['modularity_class', 'posts', 'first_row'], ascending=[True, False, True])
+    )
+    top = counts.drop_duplicates('modularity_class').set_index('modularity_class')
+
+    # Members are the repliers of the source class and the original posters of the target class
+    members = pd.concat([
+        df[['SourceModularity', 'username']].set_axis(['modularity_class', 'user'], axis=1),
+        df[['TargetModularity', 'originalUsernamePost']].set_axis(['modularity_class', 'user'], axis=1),
+    ]).groupby('modularity_class')['user'].nunique()
+
+    index = pd.DataFrame({
+        'top_user': top['originalUsernamePost'],
+        'posts': top['posts'],
+        'members': members,
+    })
+    index.index.name = 'modularity_class'
+    return index
+
+
+def build_row_index(source, target):
+    # Rows of every modularity class, grouped: the rows of class community_ids[i] are
+    # community_rows[community_offsets[i]:community_offsets[i + 1]], in file order.
+    # A row belongs to the class of its source and to the class of its target, once when they are the same.
+    rows = np.arange(len(source), dtype='int32')
+    crossing = source != target
+    classes = np.concatenate([source, target[crossing]])
+    class_rows = np.concatenate([rows, rows[crossing]])
+
+    order = np.lexsort((class_rows, classes))
+    ids, starts = np.unique(classes[order], return_index=True)
+    return {
+        'community_ids': ids.astype('int32'),
+        'community_offsets': np.append(starts, len(order)).astype('int64'),
+        'community_rows': class_rows[order].astype('int32'),
+    }
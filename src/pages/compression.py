@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# set HTTP_COMPRESSION=0 to send the responses as they are (e.g. behind a proxy that compresses)
+ENABLED = os.environ.get('HTTP_COMPRESSION', '1') == '1'
+# smaller bodies are sent as they are, compressing them saves less than the headers cost
+MIN_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# compressed bodies kept per process, keyed by the hash of the body
+CACHE_SIZE = 64
+
+# callback and layout responses, plus the index page
+PATHS = ('/_dash-update-component', '/_dash-layout', '/_dash-dependencies')
+MIMETYPES = ('application/json', 'text/html')
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _encoding(request):
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(body, digest, encoding):
+    # The figures are served from the figure cache, so the same bodies come back again and again:
+    # they are compressed once
+    key = (digest, encoding)
+    with _lock:
+        compressed = _cache.get(key)
+        if compressed is not None:
+            _cache.move_to_end(key)
+            return compressed
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+    with _lock:
+        _cache[key] = compressed
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compressed
+
+
+def compress_response(response):
+    request = flask.request
+    if request.path not in PATHS and not (request.method == 'GET' and response.mimetype == 'text/html'):
+        return response
+    if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in MIMETYPES):
+        return response
+
+    body = response.get_data()
+    digest = hashlib.sha1(body).hexdigest()[:20]
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    # The index page and the layout are the same for the same data, so the hash of the body is a valid validator:
+    # a client sending it back in If-None-Match gets a 304 without the body. Weak, as it holds for every encoding
+    # of the body. Only for GET/HEAD, a callback POST is never conditional and only gets compressed (the assets
+    # are sent by Flask with validators of their own).
+    if request.method in ('GET', 'HEAD'):
+        response.set_etag(digest, weak=True)
+        if request.if_none_match.contains_weak(digest):
+            response.status_code = 304
+            response.set_data(b'')
+            return response
+
+    encoding = _encoding(request)
+    if encoding is None or len(body) < MIN_SIZE:
+        return response
+    response.set_data(_compress(body, digest, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def register(server):
+    if ENABLED:
+        server.after_request(compress_response)
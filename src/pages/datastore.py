@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+from pages import metrics
+from pages.community_index import build_row_index
+from pages.figure_cache import file_hash
+from pages.paths import ARTIFACTS_DIR, DATA_DIR, data_path
+from pages.time_index import build_time_index
+from pages.user_index import INDEX_ARRAYS, build_user_index
+
+KRUSKAL_PICKLE = data_path('accademia_della_kruskal.pickle')
+
+# set USE_DATA_ARTIFACTS=0 to always read the csv/pickle files
+USE_ARTIFACTS = os.environ.get('USE_DATA_ARTIFACTS', '1') == '1'
+# bump when the layout of the artifacts changes, older artifacts are then ignored
+ARTIFACTS_VERSION = 4
+
+# the only columns of community_<keyword>.csv used by the pages
+COMMUNITY_COLUMNS = ['username', 'originalUsernamePost', 'agreement', 'SourceModularity', 'TargetModularity',
+                     'edge_bet']
+COMMUNITY_DTYPES = {'agreement': 'int8', 'SourceModularity': 'int32', 'TargetModularity': 'int32',
+                    'edge_bet': 'float32'}
+# free-text columns, never loaded with the others: the artifacts store them apart and community_text reads
+# only the rows it is asked for
+TEXT_COLUMNS = ['text', 'originalTweetContent', 'url']
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def slugify(keyword):
+    return keyword.replace(' ', '_').replace('/', '_')
+
+
+def community_csv(keyword):
+    return data_path(f'community_{keyword}.csv')
+
+
+def community_keywords():
+    data_files = os.listdir(DATA_DIR)
+    return [f[10:-4] for f in data_files if f.startswith('community_') and f.endswith('.csv')]
+
+
+def read_manifest():
+    # parsed again only when the file changes, build_artifacts replaces it
+    if not USE_ARTIFACTS:
+        return {}
+    path = os.path.join(ARTIFACTS_DIR, 'manifest.json')
+    try:
+        stat = os.stat(path)
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        stamp = None
+
+    def load():
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != ARTIFACTS_VERSION:
+            return {}
+        return manifest
+
+    return _memoize(('manifest',), stamp, load)
+
+
+def _artifact_entry(kind, keyword, source):
+    # The artifact of a keyword is used only if it was built from the current source file
+    entry = read_manifest().get(kind, {}).get(keyword)
+    if entry is None or entry.get('source_hash') != file_hash(source):
+        return None
+    return entry
+
+
+def _load_array(kind, keyword, name):
+    path = os.path.join(ARTIFACTS_DIR, kind, slugify(keyword), f'{name}.npy')
+    # read-only memory map, pages are shared with the other processes mapping the same file
+    return np.load(path, mmap_mode='r')
+
+
+def _memoize(key, version, load):
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == version:
+            metrics.cache_lookup(f'data.{key[0]}', 'hit')
+            return cached[1]
+    metrics.cache_lookup(f'data.{key[0]}', 'miss')
+    with metrics.span(f'data.{key[0]}'):
+        value = load()
+    with _lock:
+        _cache[key] = (version, value)
+    return value
+
+
+def keyword_memoize(name, keyword, load):
+    # a value the pages derive from the data of a keyword, loaded again when its csv changes
+    return _memoize((name, keyword), file_hash(community_csv(keyword)), load)
+
+
+def compact_ints(values):
+    # smallest of int16/int32 that holds the values, the modularity classes of a keyword fit in int16
+    values = np.asarray(values)
+    if len(values) and np.iinfo('int16').min <= values.min() and values.max() <= np.iinfo('int16').max:
+        return values.astype('int16')
+    return values.astype('int32') if len(values) else values.astype('int16')
+
+
+def encode_users(df):
+    # One sorted dictionary for repliers and original posters and the int32 codes of both columns.
+    # factorize hashes the strings once, sorting them and searching every row is several times slower.
+    usernames = df['username'].astype(str).to_numpy()
+    codes, users = pd.factorize(np.concatenate([usernames, df['originalUsernamePost'].astype(str).to_numpy()]),
+                                sort=True)
+    return {
+        'users': users.astype(str),
+        'username': codes[:len(usernames)].astype('int32'),
+        'originalUsernamePost': codes[len(usernames):].astype('int32'),
+    }
+
+
+def community_arrays(keyword):
+    # Columns of a keyword as numpy arrays (plus the 'users' dictionary of the username codes).
+    # With artifacts these are read-only memory maps shared by every worker through the page cache,
+    # otherwise the csv is parsed once per process.
+    source = community_csv(keyword)
+    version = file_hash(source)
+
+    def load():
+        if _artifact_entry('community', keyword, source) is not None:
+            names = ['users', 'username', 'originalUsernamePost', 'agreement', 'SourceModularity',
+                     'TargetModularity', 'edge_bet']
+            return {name: _load_array('community', keyword, name) for name in names}
+
+        df = read_community_csv(keyword)
+        arrays = {name: df[name].to_numpy() for name in COMMUNITY_DTYPES}
+        arrays['SourceModularity'] = compact_ints(arrays['SourceModularity'])
+        arrays['TargetModularity'] = compact_ints(arrays['TargetModularity'])
+        arrays.update(encode_users(df))
+        for values in arrays.values():
+            values.flags.writeable = False
+        return arrays
+
+    return _memoize(('community', keyword), version, load)
+
+
+def read_community_csv(keyword):
+    # Skip the free-text columns (tweets, urls, original content) that the pages never show
+    return pd.read_csv(community_csv(keyword), usecols=COMMUNITY_COLUMNS, dtype=COMMUNITY_DTYPES)[COMMUNITY_COLUMNS]
+
+
+def load_community(keyword):
+    # DataFrame view of community_arrays, built on demand so that only the shared arrays stay in memory
+    arrays = community_arrays(keyword)
+    users = arrays['users']
+    return pd.DataFrame({
+        'username': pd.Categorical.from_codes(arrays['username'], categories=users),
+        'originalUsernamePost': pd.Categorical.from_codes(arrays['originalUsernamePost'], categories=users),
+        'agreement': arrays['agreement'],
+        'SourceModularity': arrays['SourceModularity'],
+        'TargetModularity': arrays['TargetModularity'],
+        'edge_bet': arrays['edge_bet'],
+    })
+
+
+def community_row_index(keyword):
+    # Rows of every modularity class of a keyword (build_row_index), stored with the artifacts
+    source = community_csv(keyword)
+    version = file_hash(source)
+
+    def load():
+        if _artifact_entry('community', keyword, source) is not None:
+            return {name: _load_array('community', keyword, name)
+                    for name in ['community_ids', 'community_offsets', 'community_rows']}
+        arrays = community_arrays(keyword)
+        return build_row_index(arrays['SourceModularity'], arrays['TargetModularity'])
+
+    return _memoize(('row_index', keyword), version, load)
+
+
+def community_rows(keyword, community):
+    # Row numbers of the posts of one modularity class, without scanning the other rows
+    index = community_row_index(keyword)
+    position = np.searchsorted(index['community_ids'], community)
+    if position == len(index['community_ids']) or index['community_ids'][position] != community:
+        return np.empty(0, dtype='int32')
+    offsets = index['community_offsets']
+    return index['community_rows'][offsets[position]:offsets[position + 1]]
+
+
+def community_posts(keyword, community):
+    # DataFrame of the posts of one modularity class, as load_community would give after filtering, indexed by
+    # row number
+    arrays = community_arrays(keyword)
+    rows = community_rows(keyword, community)
+    users = arrays['users']
+    return pd.DataFrame(index=rows, data={
+        'username': users[arrays['username'][rows]],
+        'originalUsernamePost': users[arrays['originalUsernamePost'][rows]],
+        'agreement': arrays['agreement'][rows],
+        'SourceModularity': arrays['SourceModularity'][rows],
+        'TargetModularity': arrays['TargetModularity'][rows],
+        'edge_bet': arrays['edge_bet'][rows],
+    })
+
+
+def read_datetimes(keyword):
+    return pd.read_csv(community_csv(keyword), usecols=['datetime'], dtype=str)['datetime']
+
+
+def community_time_index(keyword):
+    # Posting times of the rows of a keyword, sorted, with the row of each (pages/time_index.py)
+    source = community_csv(keyword)
+    version = file_hash(source)
+
+    def load():
+        if _artifact_entry('community', keyword, source) is not None:
+            return {name: _load_array('community', keyword, name) for name in ['time_sorted', 'time_rows']}
+        return build_time_index(read_datetimes(keyword))
+
+    return _memoize(('time_index', keyword), version, load)
+
+
+def community_text(keyword, column, rows):
+    # Values of a text column (TEXT_COLUMNS) for some rows. The artifacts keep every column as one memory-mapped
+    # block of utf-8 bytes plus the offset of every row, so only the requested rows are read.
+    source = community_csv(keyword)
+    version = file_hash(source)
+
+    def load():
+        if _artifact_entry('community', keyword, source) is not None:
+            return _load_array('community', keyword, f'{column}_bytes'), _load_array('community', keyword,
+                                                                                      f'{column}_offsets')
+        return None
+
+    stored = _memoize(('text', keyword, column), version, load)
+    if stored is None:
+        # without artifacts the column is parsed for the call and dropped afterwards
+        values = pd.read_csv(source, usecols=[column], dtype=str, keep_default_na=False)[column]
+        return values.iloc[list(rows)].tolist()
+    data, offsets = stored
+    return [bytes(data[offsets[row]:offsets[row + 1]]).decode() for row in rows]
+
+
+def community_positions(keyword):
+    # Precomputed layout of the community graph, None when the artifacts are missing or stale
+    source = community_csv(keyword)
+    version = file_hash(source)
+
+    def load():
+        entry = _artifact_entry('community', keyword, source)
+        if entry is None or not entry.get('layout'):
+            return None
+        nodes = _load_array('community', keyword, 'layout_nodes')
+        positions = _load_array('community', keyword, 'layout_positions')
+        return {int(node): np.array(position) for node, position in zip(nodes, positions)}
+
+    return _memoize(('positions', keyword), version, load)
+
+
+def kruskal_arrays():
+    # {keyword: {'agreement': array, 'edge_bet': array}} in the order of the Kruskal pickle
+    version = file_hash(KRUSKAL_PICKLE)
+
+    def load():
+        entry = read_manifest().get('kruskal')
+        if entry is not None and entry.get('source_hash') == version:
+            return {
+                keyword: {
+                    'agreement': _load_array('kruskal', keyword, 'agreement'),
+                    'edge_bet': _load_array('kruskal', keyword, 'edge_bet'),
+                }
+                for keyword in entry['keywords']
+            }
+        with open(KRUSKAL_PICKLE, 'rb') as pickle_file:
+            accademia_della_kruskal = pickle.load(pickle_file)
+        return {
+            keyword: {'agreement': df['agreement'].to_numpy(), 'edge_bet': df['edge_bet'].to_numpy()}
+            for keyword, df in accademia_della_kruskal.items()
+        }
+
+    return _memoize(('kruskal',), version, load)
+
+
+def users_source_hash():
+    # changes whenever one of the community csvs changes, or a keyword is added or removed
+    hashes = [f'{keyword}:{file_hash(community_csv(keyword))}' for keyword in sorted(community_keywords())]
+    return hashlib.sha1(' '.join(hashes).encode()).hexdigest()[:16]
+
+
+def user_index():
+    # Classes and agreement counts of every user across the keywords (pages/user_index.py), stored with the
+    # artifacts
+    version = users_source_hash()
+
+    def load():
+        entry = read_manifest().get('users')
+        if entry is not None and entry.get('source_hash') == version:
+            return {name: _load_array('users', 'all', name) for name in INDEX_ARRAYS}
+        return build_user_index({keyword: community_arrays(keyword) for keyword in community_keywords()})
+
+    return _memoize(('users',), version, load)
+
+
+def preload():
+    # Open every dataset, used by gunicorn's preload_app so that the workers inherit them from the master
+    for keyword in community_keywords():
+        community_arrays(keyword)
+    kruskal_arrays()
+    user_index()
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pages import metrics, paths
+
+# serialized figures are written here so every gunicorn worker can reuse them
+CACHE_DIR = os.environ.get('FIGURE_CACHE_DIR', paths.CACHE_DIR)
+# maximum number of figures kept in memory by each cache
+MAX_SIZE = int(os.environ.get('FIGURE_CACHE_SIZE', 16))
+# seconds a figure in memory is served without checking the version of its data again (a stat of the csv)
+CHECK_INTERVAL = float(os.environ.get('FIGURE_CACHE_CHECK_SECONDS', 2))
+
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+
+def file_hash(path):
+    # Hash the content of a data file, re-reading it only when size or mtime change
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    with _hashes_lock:
+        cached = _hashes.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()[:16]
+
+    with _hashes_lock:
+        _hashes[path] = (stamp, digest)
+    return digest
+
+
+class FigureCache:
+    # Bounded LRU of plotly figures backed by JSON files on disk.
+    # `build(key)` creates the figure, `version(key)` returns a string that changes
+    # whenever the data behind the figure changes (e.g. the hash of the source csv).
+
+    def __init__(self, name, build, version, revision=1, max_size=MAX_SIZE, cache_dir=CACHE_DIR,
+                 check_interval=CHECK_INTERVAL):
+        self.name = name
+        self.build = build
+        self.version = version
+        self.revision = revision
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        # key -> [version, figure, time the version was last checked]
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _slug(self, key):
+        # tuple keys, e.g. (keyword, community), are joined with dashes
+        slug = '-'.join(map(str, key)) if isinstance(key, tuple) else str(key)
+        return slug.replace(' ', '_').replace('/', '_')
+
+    def _path(self, key, version):
+        return os.path.join(self.cache_dir, f"{self.name}-r{self.revision}-{self._slug(key)}-{version}.json")
+
+    def _is_stale(self, file, slug, current):
+        # a figure of the same cache and key built by any revision or from any version of the data:
+        # {name}-r{revision}-{slug}-{version}.json, the version has no dashes
+        prefix = f"{self.name}-r"
+        if file == current or not file.startswith(prefix) or not file.endswith('.json'):
+            return False
+        revision, _, rest = file[len(prefix):-len('.json')].partition('-')
+        return revision.isdigit() and rest.rsplit('-', 1)[0] == slug and '-' in rest
+
+    def _load(self, key, version):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key, version)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key, version, payload):
+        if not self.cache_dir:
+            return
+        path = self._path(key, version)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temp file first so other workers never read half a figure
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            # drop figures built by older revisions or from older versions of the data
+            slug = self._slug(key)
+            for file in os.listdir(self.cache_dir):
+                if self._is_stale(file, slug, os.path.basename(path)):
+                    os.remove(os.path.join(self.cache_dir, file))
+        except OSError:
+            pass
+
+    def _remember(self, key, version, figure):
+        with self._lock:
+            self._figures[key] = [version, figure, time.monotonic()]
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_size:
+                self._figures.popitem(last=False)
+
+    def _cached(self, key, version=None):
+        # the figure in memory: without a version only while its last check is recent, with a version only if
+        # it was built from it
+        now = time.monotonic()
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is None:
+                return None
+            if version is None:
+                if now - entry[2] >= self.check_interval:
+                    return None
+            elif entry[0] == version:
+                entry[2] = now
+            else:
+                return None
+            self._figures.move_to_end(key)
+            metrics.cache_lookup(self.name, 'memory')
+            return entry[1]
+
+    def get(self, key):
+        # the version computed for the entry in memory is reused for check_interval seconds
+        figure = self._cached(key)
+        if figure is not None:
+            return figure
+        version = self.version(key)
+        figure = self._cached(key, version)
+        if figure is not None:
+            return figure
+
+        figure = self._load(key, version)
+        if figure is None:
+            metrics.cache_lookup(self.name, 'miss')
+            with metrics.span(f'{self.name}.build'):
+                built = self.build(key)
+            with metrics.span(f'{self.name}.serialize'):
+                # plotly figures, or plain json data sent as is to the browser
+                payload = built.to_json() if hasattr(built, 'to_json') else json.dumps(built)
+                figure = json.loads(payload)
+            self._store(key, version, payload)
+        else:
+            metrics.cache_lookup(self.name, 'disk')
+
+        self._remember(key, version, figure)
+        return figure
+
+    def warm(self, keys):
+        for key in keys:
+            self.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
@@ -0,0 +1,172 @@
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pages import datastore
+from pages.figure_cache import file_hash
+from pages.paths import ARTIFACTS_DIR
+
+# written by `python -m tools.kruskal_stats`, with bootstrap confidence intervals
+STATS_CSV = os.path.join(ARTIFACTS_DIR, 'kruskal_stats.csv')
+
+GROUPS = [1, -1]
+
+
+def chi2_sf(x, df):
+    # survival function of the chi-squared distribution for an integer number of degrees of freedom
+    if x <= 0:
+        return 1.0
+    half = x / 2
+    if df % 2 == 0:
+        term = total = math.exp(-half)
+        for i in range(1, df // 2):
+            term *= half / i
+            total += term
+        return min(1.0, total)
+    total = math.erfc(math.sqrt(half))
+    term = math.exp(-half) * math.sqrt(half / math.pi) * 2
+    for i in range(1, (df + 1) // 2):
+        total += term
+        term *= half / (i + 0.5)
+    return min(1.0, total)
+
+
+def batched_ranks(values, blocks):
+    # Average ranks (ties share their mean rank) of `values` computed separately inside every block,
+    # with a single sort of all the blocks together. Returns the ranks and the tie correction per block.
+    order = np.lexsort((values, blocks))
+    sorted_values, sorted_blocks = values[order], blocks[order]
+
+    # runs of equal (block, value) pairs are ties
+    starts = np.flatnonzero(np.r_[True, (sorted_values[1:] != sorted_values[:-1]) |
+                                        (sorted_blocks[1:] != sorted_blocks[:-1])])
+    lengths = np.diff(np.r_[starts, len(values)])
+    block_starts = np.searchsorted(sorted_blocks, sorted_blocks[starts])
+    # positions are 1-based inside their block, a tie run gets the mean of its positions
+    run_ranks = (starts - block_starts) + (lengths + 1) / 2
+
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(run_ranks, lengths)
+
+    n_blocks = int(blocks.max()) + 1 if len(blocks) else 0
+    ties = np.bincount(sorted_blocks[starts], weights=lengths.astype(float) ** 3 - lengths, minlength=n_blocks)
+    return ranks, ties
+
+
+def kruskal_wallis(values, labels, blocks=None):
+    # Kruskal-Wallis H and p-value of `values` split by `labels`, for every block at once
+    values = np.asarray(values, dtype=float)
+    labels = np.asarray(labels)
+    blocks = np.zeros(len(values), dtype=np.intp) if blocks is None else np.asarray(blocks, dtype=np.intp)
+
+    ranks, ties = batched_ranks(values, blocks)
+    groups, group_ids = np.unique(labels, return_inverse=True)
+    n_blocks = int(blocks.max()) + 1
+    cells = blocks * len(groups) + group_ids
+
+    rank_sums = np.bincount(cells, weights=ranks, minlength=n_blocks * len(groups)).reshape(n_blocks, -1)
+    counts = np.bincount(cells, minlength=n_blocks * len(groups)).reshape(n_blocks, -1)
+    n = counts.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = 12 / (n * (n + 1)) * np.nansum(rank_sums ** 2 / counts, axis=1) - 3 * (n + 1)
+        h = h / (1 - ties / (n ** 3 - n))
+
+    df = (counts > 0).sum(axis=1) - 1
+    p = np.array([chi2_sf(statistic, dof) if dof > 0 else np.nan for statistic, dof in zip(h, df)])
+    return h, p
+
+
+def _bootstrap_h(args):
+    values, labels, replicates, seed = args
+    rng = np.random.default_rng(seed)
+
+    # rank the values once: a resample only changes how many copies of each distinct value there are,
+    # so its ranks follow from the counts of the distinct values
+    distinct, value_ids = np.unique(values, return_inverse=True)
+    groups = [value_ids[labels == group] for group in GROUPS]
+    n = sum(len(ids) for ids in groups)
+
+    statistics = np.empty(replicates)
+    for i in range(replicates):
+        # resample each group with replacement, keeping its size
+        samples = [rng.choice(ids, len(ids)) for ids in groups]
+        counts = np.bincount(np.concatenate(samples), minlength=len(distinct))
+        value_ranks = np.cumsum(counts) - counts + (counts + 1) / 2
+
+        rank_sums = sum(value_ranks[ids].sum() ** 2 / len(ids) for ids in samples if len(ids))
+        h = 12 / (n * (n + 1)) * rank_sums - 3 * (n + 1)
+        statistics[i] = h / (1 - (counts.astype(float) ** 3 - counts).sum() / (n ** 3 - n))
+    return statistics
+
+
+def bootstrap_interval(values, labels, replicates=1000, confidence=0.95, workers=None, seed=42):
+    # percentile bootstrap interval of H, the replicates are split across a process pool
+    workers = workers or os.cpu_count() or 1
+    chunks = [replicates // workers + (i < replicates % workers) for i in range(workers)]
+    jobs = [(values, labels, size, seed + i) for i, size in enumerate(chunks) if size]
+    if workers == 1:
+        statistics = np.concatenate([_bootstrap_h(job) for job in jobs])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            statistics = np.concatenate(list(pool.map(_bootstrap_h, jobs)))
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(statistics, [tail, 100 - tail])
+
+
+def kruskal_table(replicates=0, workers=None):
+    # H and p-value of agreement vs disagreement edge betweenness for every keyword, in one batched pass
+    accademia_della_kruskal = datastore.kruskal_arrays()
+    keywords = list(accademia_della_kruskal)
+    values = np.concatenate([np.asarray(arrays['edge_bet']) for arrays in accademia_della_kruskal.values()])
+    labels = np.concatenate([np.asarray(arrays['agreement']) for arrays in accademia_della_kruskal.values()])
+    sizes = [len(arrays['edge_bet']) for arrays in accademia_della_kruskal.values()]
+    blocks = np.repeat(np.arange(len(keywords)), sizes)
+
+    h, p = kruskal_wallis(values, labels, blocks)
+    table = pd.DataFrame({
+        'keyword': keywords,
+        'n_agreement': [int((arrays['agreement'] == 1).sum()) for arrays in accademia_della_kruskal.values()],
+        'n_disagreement': [int((arrays['agreement'] == -1).sum()) for arrays in accademia_della_kruskal.values()],
+        'H': h,
+        'p_value': p,
+    })
+
+    if replicates:
+        intervals = [
+            bootstrap_interval(values[blocks == i], labels[blocks == i], replicates, workers=workers)
+            for i in range(len(keywords))
+        ]
+        table['H_low'] = [interval[0] for interval in intervals]
+        table['H_high'] = [interval[1] for interval in intervals]
+    table['source_hash'] = file_hash(datastore.KRUSKAL_PICKLE)
+    return table
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def cached_kruskal_table():
+    # The table with bootstrap intervals when STATS_CSV matches the current data, else H and p computed here
+    global _table
+    version = file_hash(datastore.KRUSKAL_PICKLE)
+    with _table_lock:
+        if _table is not None and _table[0] == version:
+            return _table[1]
+
+    table = None
+    if os.path.exists(STATS_CSV):
+        table = pd.read_csv(STATS_CSV)
+        if table['source_hash'].iloc[0] != version:
+            table = None
+    if table is None:
+        table = kruskal_table()
+
+    with _table_lock:
+        _table = (version, table)
+    return table
@@ -0,0 +1,124 @@
+import hashlib
+import os
+
+import networkx as nx
+import numpy as np
+
+# spring: nx.spring_layout, numpy: force_layout, auto: spring_layout below DENSE_LIMIT nodes and force_layout above.
+# Above 500 nodes spring_layout switches to a scipy sparse solver that loops over the nodes in python.
+LAYOUT_ENGINE = os.environ.get('LAYOUT_ENGINE', 'auto')
+DENSE_LIMIT = 500
+
+# iterations and starting temperature when the previous positions are reused
+WARM_ITERATIONS = 15
+WARM_TEMPERATURE = 0.02
+# share of the nodes that must already have a position to warm start
+WARM_MIN_OVERLAP = 0.5
+
+# pairs of nodes handled at once by the repulsion step, small enough for the blocks to stay in the cpu cache
+CHUNK_PAIRS = 65_536
+
+
+def graph_hash(G):
+    # identifies the nodes and edges of a graph, the layout is computed once per hash
+    nodes = sorted(map(str, G.nodes))
+    edges = sorted(f'{u}>{v}' for u, v in G.edges)
+    return hashlib.sha1('\n'.join(nodes + ['--'] + edges).encode()).hexdigest()[:16]
+
+
+def _edge_arrays(G, nodes):
+    # undirected edge list as index arrays, one entry per connected pair
+    index = {node: i for i, node in enumerate(nodes)}
+    pairs = {tuple(sorted((index[u], index[v]))) for u, v in G.edges if u != v}
+    if not pairs:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    sources, targets = np.array(sorted(pairs), dtype=np.intp).T
+    return sources, targets
+
+
+def _rescale(pos):
+    # same as nx.rescale_layout(pos, scale=1): centred on the origin, largest coordinate at 1
+    pos = pos - pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos / extent if extent > 0 else pos
+
+
+def force_layout(G, pos=None, iterations=50, temperature=0.1, threshold=1e-4, seed=42):
+    # Fruchterman-Reingold with the same forces and cooling as nx.spring_layout, vectorized with numpy:
+    # the repulsion between every pair of nodes is computed in blocks of rows, the attraction only along
+    # the edges. Memory stays O(n + edges) whatever the size of the graph.
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+
+    rng = np.random.RandomState(seed)
+    coords = rng.rand(n, 2)
+    if pos is not None:
+        for i, node in enumerate(nodes):
+            if node in pos:
+                coords[i] = pos[node]
+
+    sources, targets = _edge_arrays(G, nodes)
+    k = np.sqrt(1 / n)
+    t = max(np.ptp(coords[:, 0]), np.ptp(coords[:, 1])) * temperature
+    dt = t / (iterations + 1)
+    chunk = max(1, CHUNK_PAIRS // n)
+
+    for _ in range(iterations):
+        displacement = np.empty((n, 2))
+        x, y = coords[:, 0], coords[:, 1]
+        for start in range(0, n, chunk):
+            dx = x[start:start + chunk, None] - x
+            dy = y[start:start + chunk, None] - y
+            force = dx * dx
+            force += dy * dy
+            np.maximum(force, 1e-4, out=force)
+            np.divide(k * k, force, out=force)
+            displacement[start:start + chunk, 0] = (dx * force).sum(axis=1)
+            displacement[start:start + chunk, 1] = (dy * force).sum(axis=1)
+
+        delta = coords[sources] - coords[targets]
+        pull = delta * (np.sqrt(np.maximum((delta ** 2).sum(axis=1), 1e-4)) / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(sources, weights=pull[:, axis], minlength=n)
+            displacement[:, axis] += np.bincount(targets, weights=pull[:, axis], minlength=n)
+
+        length = np.sqrt((displacement ** 2).sum(axis=1))
+        length = np.where(length < 0.01, 0.1, length)
+        step = displacement * (t / length)[:, None]
+        coords += step
+        t -= dt
+        if np.linalg.norm(step) / n < threshold:
+            break
+
+    return dict(zip(nodes, _rescale(coords)))
+
+
+def can_warm_start(G, previous):
+    return bool(previous) and len(G) > 0 and sum(node in previous for node in G) >= WARM_MIN_OVERLAP * len(G)
+
+
+def compute_layout(G, previous=None, engine=None, seed=42):
+    # Positions of the nodes of G. `previous` holds the positions of an earlier version of the graph: when it
+    # covers most of the nodes the layout starts from it with a few cool iterations, so a small change of the
+    # graph moves the nodes a little instead of reshuffling the whole picture. New nodes start at the centre
+    # of their already placed neighbours.
+    engine = engine or LAYOUT_ENGINE
+    if engine not in ('auto', 'spring', 'numpy'):
+        raise ValueError(f"unknown layout engine {engine!r}")
+
+    if can_warm_start(G, previous):
+        start = {node: np.asarray(previous[node], dtype=float) for node in G if node in previous}
+        for node in G:
+            if node not in start:
+                placed = [start[neighbour] for neighbour in nx.all_neighbors(G, node) if neighbour in start]
+                if placed:
+                    start[node] = np.mean(placed, axis=0)
+        return force_layout(G, start, iterations=WARM_ITERATIONS, temperature=WARM_TEMPERATURE, seed=seed)
+
+    if engine == 'spring' or (engine == 'auto' and len(G) < DENSE_LIMIT):
+        return nx.spring_layout(G, seed=seed)
+    return force_layout(G, seed=seed)
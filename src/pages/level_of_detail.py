@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+
+# Level of detail of the Relationships figure (NETWORK_EDGE_MODE=lod).
+# Edges drawn at the default zoom, the ones with the highest edge betweenness
+TOP_EDGES = int(os.environ.get('NETWORK_TOP_EDGES', 100))
+# Most points in one figure: 3 per edge (x0, x1 and the gap) plus 1 per node. Zooming in or selecting a
+# community adds the edges of that view up to this budget.
+POINT_BUDGET = int(os.environ.get('NETWORK_POINT_BUDGET', 1500))
+# Most traces in one figure, the node trace included. Edges are drawn with one trace per colour and line width,
+# so this bounds the number of width classes.
+TRACE_BUDGET = int(os.environ.get('NETWORK_TRACE_BUDGET', 9))
+# line widths of the thinnest and of the thickest aggregate edges
+MIN_WIDTH = 0.5
+MAX_WIDTH = 4
+
+
+def aggregate_edges(df):
+    # One edge per community pair and agreement, with the number of posts it stands for as weight. The community
+    # graph keeps only the last post of a pair, so pairs with both agreeing and disagreeing posts lose one side.
+    # edge_bet is the same for every post of a pair.
+    inter = df[df['SourceModularity'] != df['TargetModularity']]
+    edges = (inter.groupby(['SourceModularity', 'TargetModularity', 'agreement'], sort=False)
+             .agg(weight=('edge_bet', 'size'), edge_bet=('edge_bet', 'max'))
+             .reset_index()
+             .rename(columns={'SourceModularity': 'source', 'TargetModularity': 'target'}))
+    # strongest first, so that the top N are the first N rows
+    return edges.sort_values(['edge_bet', 'weight'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+def edge_budget(node_count):
+    return max(0, (POINT_BUDGET - node_count) // 3)
+
+
+def select_edges(edges, pos, x_range=None, y_range=None, community=None):
+    # Rows of the aggregate edges to draw for a view: the top TOP_EDGES of the whole graph by default, every edge
+    # that crosses the visible ranges when zoomed in and every edge of the selected community first, within the
+    # point budget
+    budget = edge_budget(len(pos))
+    if x_range is None and y_range is None and community is None:
+        return edges.head(min(TOP_EDGES, budget))
+
+    keep = np.ones(len(edges), dtype=bool)
+    if x_range is not None or y_range is not None:
+        source = np.array([pos[node] for node in edges['source']], dtype=float).reshape(-1, 2)
+        target = np.array([pos[node] for node in edges['target']], dtype=float).reshape(-1, 2)
+        # bounding box of the segment against the view, cheap and never misses a visible edge
+        for axis, bounds in enumerate([x_range, y_range]):
+            if bounds is not None:
+                low, high = sorted(bounds)
+                keep &= (np.minimum(source[:, axis], target[:, axis]) <= high)
+                keep &= (np.maximum(source[:, axis], target[:, axis]) >= low)
+
+    if community is not None:
+        selected = ((edges['source'] == community) | (edges['target'] == community)).to_numpy()
+        # the edges of the community come first, the rest of the view fills the budget after them
+        order = np.concatenate([np.flatnonzero(selected), np.flatnonzero(keep & ~selected)])
+        return edges.iloc[order[:budget]]
+    return edges[keep].head(budget)
+
+
+def width_classes(weights, classes):
+    # Line width of every edge, from `classes` widths evenly spaced on the log of the weight
+    weights = np.log(np.asarray(weights, dtype=float))
+    if classes <= 1 or len(weights) == 0 or weights.max() == weights.min():
+        return np.full(len(weights), MIN_WIDTH)
+    bins = np.linspace(weights.min(), weights.max(), classes + 1)[1:-1]
+    return np.linspace(MIN_WIDTH, MAX_WIDTH, classes)[np.digitize(weights, bins)]
+
+
+def view_ranges(relayout_data):
+    # x and y ranges of a relayoutData event of dcc.Graph, None for an axis that is not zoomed
+    if not relayout_data:
+        return None, None
+    ranges = []
+    for axis in ['xaxis', 'yaxis']:
+        if relayout_data.get(f'{axis}.autorange'):
+            ranges.append(None)
+        elif f'{axis}.range[0]' in relayout_data:
+            ranges.append((relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']))
+        else:
+            ranges.append(relayout_data.get(f'{axis}.range'))
+    return tuple(ranges)
+
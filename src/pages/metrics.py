@@ -0,0 +1,242 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+import flask
+
+from pages import paths
+
+# Instrumentation of the app, served by /metrics in the Prometheus text format. Every gunicorn worker keeps its own
+# numbers, so a scrape shows the worker that answered it (the pid of capitol_process_resident_bytes tells them
+# apart). METRICS=0 turns the route and the request hooks off, the spans still count.
+ENABLED = os.environ.get('METRICS', '1') == '1'
+# upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# PROFILE_SLOW_MS=500 samples the stack of every request every PROFILE_INTERVAL_MS and writes the folded stacks
+# (flamegraph.pl, speedscope) of the requests slower than that to PROFILE_DIR. Off by default.
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS') or 0)
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(paths.CACHE_DIR, 'profiles')
+
+_lock = threading.Lock()
+# callback_map of the Dash app, set by register: only its outputs become label values
+_callback_map = {}
+
+
+def _labels(names, values):
+    # {name="value",...} with the escapes of the text format
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class CounterMetric:
+
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = Counter()
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self.values[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with _lock:
+            values = sorted(self.values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{{{_labels(self.labels, labels)}}} {value}')
+        return lines
+
+
+class HistogramMetric:
+
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        # labels -> [count of every bucket and of +Inf (not cumulative), sum]
+        self.series = {}
+
+    def observe(self, seconds, *labels):
+        with _lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(BUCKETS) + 1) + [0.0]
+            series[bisect_left(BUCKETS, seconds)] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with _lock:
+            series = sorted((labels, list(values)) for labels, values in self.series.items())
+        for labels, values in series:
+            names = _labels(self.labels, labels)
+            total = 0
+            for bound, count in zip([*BUCKETS, '+Inf'], values[:-1]):
+                total += count
+                lines.append(f'{self.name}_bucket{{{names},le="{bound}"}} {total}')
+            lines.append(f'{self.name}_sum{{{names}}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{names}}} {total}')
+        return lines
+
+
+CALLBACK_SECONDS = HistogramMetric('capitol_callback_seconds', 'Latency of the Dash callbacks, by output.',
+                                   ['callback'])
+REQUESTS = CounterMetric('capitol_http_requests_total', 'Requests by Flask endpoint and status.',
+                         ['endpoint', 'status'])
+STAGE_SECONDS = HistogramMetric('capitol_stage_seconds', 'Time spent in the data-loading and figure-building stages.',
+                                ['stage'])
+CACHE_LOOKUPS = CounterMetric('capitol_cache_lookups_total', 'Lookups of the figure and data caches by result.',
+                              ['cache', 'result'])
+PROFILES = CounterMetric('capitol_profiles_written_total', 'Slow requests whose stacks were written.', ['callback'])
+METRICS = [CALLBACK_SECONDS, REQUESTS, STAGE_SECONDS, CACHE_LOOKUPS, PROFILES]
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+
+def cache_lookup(cache, result):
+    CACHE_LOOKUPS.inc(cache, result)
+
+
+def resident_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    rss = resident_bytes()
+    if rss is not None:
+        lines += ['# HELP capitol_process_resident_bytes Resident memory of the worker.',
+                  '# TYPE capitol_process_resident_bytes gauge',
+                  f'capitol_process_resident_bytes{{pid="{os.getpid()}"}} {rss}']
+    return '\n'.join(lines) + '\n'
+
+
+class Sampler:
+    # Samples the stacks of the threads serving a request from a thread of its own. A stack is folded into
+    # "outermost;...;innermost" with one frame per function, the format of flamegraph.pl and speedscope.
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, ident):
+        with self.lock:
+            self.samples[ident] = Counter()
+            # started in the worker on its first request, never in the gunicorn master before the fork
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='metrics-sampler', daemon=True)
+                self.thread.start()
+
+    def stop(self, ident):
+        with self.lock:
+            return self.samples.pop(ident, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                idents = list(self.samples)
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                with self.lock:
+                    if stack and ident in self.samples:
+                        self.samples[ident][';'.join(reversed(stack))] += 1
+
+
+_sampler = Sampler(PROFILE_INTERVAL_MS / 1000) if PROFILE_SLOW_MS else None
+
+
+def write_profile(name, elapsed_ms, samples):
+    slug = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)[:80]
+    file_name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{slug}-{elapsed_ms:.0f}ms.folded'
+    path = os.path.join(PROFILE_DIR, file_name)
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in samples.most_common())
+    except OSError:
+        return
+    PROFILES.inc(name)
+
+
+def callback_name():
+    # the output of a Dash callback request, the path for the other requests. The output comes from the client,
+    # so anything but a registered callback is 'unknown' and the number of series stays bounded.
+    if flask.request.path.endswith('/_dash-update-component'):
+        body = flask.request.get_json(silent=True)
+        output = body.get('output') if isinstance(body, dict) else None
+        return output if isinstance(output, str) and output in _callback_map else 'unknown'
+    return flask.request.path
+
+
+def before_request():
+    flask.g.metrics_start = time.perf_counter()
+    if _sampler is not None:
+        _sampler.start(threading.get_ident())
+
+
+def after_request(response):
+    start = getattr(flask.g, 'metrics_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    REQUESTS.inc(flask.request.endpoint or 'none', response.status_code)
+    if flask.request.path.endswith('/_dash-update-component'):
+        CALLBACK_SECONDS.observe(elapsed, callback_name())
+    if _sampler is not None:
+        samples = _sampler.stop(threading.get_ident())
+        if samples and elapsed * 1000 >= PROFILE_SLOW_MS:
+            write_profile(callback_name(), elapsed * 1000, samples)
+    return response
+
+
+def teardown_request(error):
+    # a request that failed before after_request
+    if _sampler is not None:
+        _sampler.stop(threading.get_ident())
+
+
+def metrics_route():
+    return flask.Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def register(server, callback_map):
+    # before compression.register: the after_request hooks run last to first, so the latency includes compression.
+    # callback_map is the one of the Dash app, filled with the page callbacks on the first request.
+    global _callback_map
+    _callback_map = callback_map
+    if ENABLED:
+        server.before_request(before_request)
+        server.after_request(after_request)
+        server.teardown_request(teardown_request)
+        server.add_url_rule('/metrics', 'metrics', metrics_route)
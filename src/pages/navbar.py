@@ -1,13 +1,6 @@
 import dash_bootstrap_components as dbc
 import dash_html_components as html
 import dash
-import os
-
-#setting the path to call datasets and images 
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-dname = dname.replace("\\", "/")
-os.chdir(dname)
 
 HEADER_STYLE = {
     "width": "100%",
@@ -0,0 +1,42 @@
+import networkx as nx
+import pandas as pd
+
+from pages.layout import compute_layout
+
+
+def build_community_graph(df):
+    # Group the data by SourceModularity and TargetModularity
+    grouped = df.groupby(['SourceModularity', 'TargetModularity'])
+    filtered_groups = [(name, group) for name, group in grouped if name[0] != name[1]]
+    # e.g. a time window without posts between two communities
+    if not filtered_groups:
+        return nx.DiGraph()
+
+    # Create a NetworkX graph from the filtered DataFrame
+    return nx.from_pandas_edgelist(
+        pd.concat([group for _, group in filtered_groups]),
+        'SourceModularity',
+        'TargetModularity',
+        edge_attr=['agreement', 'edge_bet'],  # Add 'agreement' and 'edge_bet' attributes
+        create_using=nx.DiGraph()
+    )
+
+
+def community_layout(G, previous=None):
+    return compute_layout(G, previous, seed=42)
+
+
+def build_reply_graph(posts):
+    # Users of the posts of a community, with an edge from the replier to the original poster weighted by the
+    # number of replies. The agreement of an edge is the one of most of its replies, disagreement on a tie.
+    edges = (posts.groupby(['username', 'originalUsernamePost'], sort=False, observed=True)['agreement']
+             .agg(weight='size', agreement='sum')
+             .reset_index())
+    edges['agreement'] = (edges['agreement'] > 0).astype(int) * 2 - 1
+    return nx.from_pandas_edgelist(
+        edges,
+        'username',
+        'originalUsernamePost',
+        edge_attr=['agreement', 'weight'],
+        create_using=nx.DiGraph()
+    )
@@ -4,6 +4,7 @@ import dash_html_components as html
 from dash.dependencies import Input, Output
 import dash_core_components as dcc
 from pages.navbar import header_menu, CONTENT_STYLE
+from pages.static_assets import responsive_image
 
 dash.register_page(__name__, path='/', name='Homepage')
 
@@ -26,7 +27,8 @@ layout = dbc.Container([
 
     dbc.Row([
         dbc.Col([
-            html.Img(src=r'assets/twitter_funnel copia.png', alt='image', height="100%", width="100%")
+            responsive_image('twitter_funnel copia.png', sizes='(min-width: 992px) 50vw, 100vw', alt='image',
+                             height="100%", width="100%")
         ], width=6),
         dbc.Col([
             html.Br(),
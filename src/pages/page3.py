@@ -1,26 +1,18 @@
 import dash
 from dash import dcc, html, Input, Output, State, callback
 import plotly.graph_objs as go
-from plotly.subplots import make_subplots
 import pandas as pd
-import json
-import pickle
 import numpy as np
 import dash_bootstrap_components as dbc
-import os
-
-#setting the path to call datasets and images 
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-dname = dname.replace("\\", "/")
-os.chdir(dname)
+from pages import datastore, metrics, warmup
+from pages.figure_cache import FigureCache, file_hash
+from pages.paths import data_path
+from pages.percentiles import edge_bet_sample
+from pages.kruskal import cached_kruskal_table
 
 dash.register_page(__name__, name='Polarization')
 
-barplottolo = pd.read_csv('data/barplottolo.csv')
-with open('data/accademia_della_kruskal.pickle', 'rb') as pickle_file:
-    # Load the dictionary from the file
-    accademia_della_kruskal = pickle.load(pickle_file)
+BARPLOT_CSV = data_path('barplottolo.csv')
 
 
 
@@ -54,96 +46,89 @@ faq_section = html.Div([
 
 
 
-layout = dbc.Container([
-    dbc.Row([
-        dbc.Col([
-            html.H1('Unveiling Polarization: A Twitter Discourse Analysis',
-                    style={'textAlign': 'center', 'font-weight': 'bold', 'color': 'black'}),
-            html.P("""Journey with us as we delve into the Twitterverse, harnessing the power of keywords to unravel political discourse.
-            Our exploration reveals not only the most tweeted keywords, but also the polarization within communities. This unique insight allows us 
-            to gauge the state of political discourse with unparalleled depth.
-            """,
-                    style={'textAlign': 'center', 'color': 'black','font-size': '20px'})
-
-        ], width=12)
-    ], style={'marginBottom': '50px', 'marginTop': '50px'}),
-
-    dbc.Row([
-        dbc.Col([
-            html.H4("Top 7 Keywords by Occurrence: The Power Players of Political Discourse",
-                    style={'textAlign': 'center', 'font-weight': 'bold', 'color': 'black'}),
-            dcc.Graph(id="keywords_barplot"),
-        ], width=8),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.P("""This visualization represents the most influential keywords that shaped the Twitter discourse 
-                    during the politically charged period from October 2020 to January 6, 2021. The identified keywords played 
-                    a central role in driving conversations within the intricate ego networks of influential individuals. Understanding 
-                    the prevalence of these keywords gives us insights into the themes that were central to political dialogues during this period.""",
-                    className="card-text")
-                ])
-            ], style={'marginTop': '110px'})
-        ], width=4),
-    ], style={'marginBottom': '50px'}),
-
-    dbc.Row([
-        dbc.Col([
-            html.H4("Edge Betweenness Percentiles: Unveiling the Bridge Keywords",
-                    style={'textAlign': 'center', 'font-weight': 'bold', 'color': 'black'}),
-            dcc.Graph(id="edge_bet_percentiles_plot"),
-        ], width=8),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.P("""This visualization helps us understand the patterns of agreement and disagreement that were prominent 
-                    during this significant period. The edge betweenness metric reveals the potential bridge keywords which have significant 
-                    influence in connecting different communities. This analysis, along with the use of the Roberta-large model and the Greedy Modularity 
-                    algorithm, helped us to better understand the dynamics of these discussions and the role of ego networks in shaping public opinion.""",
-                    className="card-text")
-                ])
-            ], style={'marginTop': '100px'})
-        ], width=4),
-    ], style={'marginBottom': '50px'}),
-
-    dbc.Row([
-        dbc.Col([
-            html.H4("How We Did It: A Peek Behind The Curtain",
-                    style={'textAlign': 'left', 'font-weight': 'bold', 'color': 'black'}),
-            faq_section,
-        ], width=12)
-    ], style={'marginBottom': '30px', 'marginTop': '30px'}),
-
-    dbc.Row([
-        dbc.Col([
-            dcc.Link('Want more? Return to the main page', href='/')
-        ], width=12, style={'textAlign': 'center', 'marginBottom': '30px', 'marginTop': '30px'}),
-    ]),
-
-    dbc.Row([
-        dbc.Col([
-            dcc.Input(id='dummy-input', type='hidden', value='dummy')
-        ], width=12)
+def layout(**kwargs):
+    # The figures are static for a given version of the data, so they come from the cache
+    # and are embedded in the layout instead of being filled by a callback after the page loads
+    return dbc.Container([
+        dbc.Row([
+            dbc.Col([
+                html.H1('Unveiling Polarization: A Twitter Discourse Analysis',
+                        style={'textAlign': 'center', 'font-weight': 'bold', 'color': 'black'}),
+                html.P("""Journey with us as we delve into the Twitterverse, harnessing the power of keywords to unravel political discourse.
+                Our exploration reveals not only the most tweeted keywords, but also the polarization within communities. This unique insight allows us 
+                to gauge the state of political discourse with unparalleled depth.
+                """,
+                        style={'textAlign': 'center', 'color': 'black','font-size': '20px'})
+
+            ], width=12)
+        ], style={'marginBottom': '50px', 'marginTop': '50px'}),
+
+        dbc.Row([
+            dbc.Col([
+                html.H4("Top 7 Keywords by Occurrence: The Power Players of Political Discourse",
+                        style={'textAlign': 'center', 'font-weight': 'bold', 'color': 'black'}),
+                dcc.Graph(id="keywords_barplot", figure=polarization_figures.get('keywords_barplot')),
+            ], width=8),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.P("""This visualization represents the most influential keywords that shaped the Twitter discourse 
+                        during the politically charged period from October 2020 to January 6, 2021. The identified keywords played 
+                        a central role in driving conversations within the intricate ego networks of influential individuals. Understanding 
+                        the prevalence of these keywords gives us insights into the themes that were central to political dialogues during this period.""",
+                        className="card-text")
+                    ])
+                ], style={'marginTop': '110px'})
+            ], width=4),
+        ], style={'marginBottom': '50px'}),
+
+        dbc.Row([
+            dbc.Col([
+                html.H4("Edge Betweenness Percentiles: Unveiling the Bridge Keywords",
+                        style={'textAlign': 'center', 'font-weight': 'bold', 'color': 'black'}),
+                dcc.Graph(id="edge_bet_percentiles_plot",
+                          figure=polarization_figures.get('edge_bet_percentiles_plot')),
+            ], width=8),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.P("""This visualization helps us understand the patterns of agreement and disagreement that were prominent 
+                        during this significant period. The edge betweenness metric reveals the potential bridge keywords which have significant 
+                        influence in connecting different communities. This analysis, along with the use of the Roberta-large model and the Greedy Modularity 
+                        algorithm, helped us to better understand the dynamics of these discussions and the role of ego networks in shaping public opinion.""",
+                        className="card-text")
+                    ])
+                ], style={'marginTop': '100px'})
+            ], width=4),
+        ], style={'marginBottom': '50px'}),
+
+        dbc.Row([
+            dbc.Col([
+                html.H4("Kruskal-Wallis Test: Agreement vs Disagreement Edge Betweenness",
+                        style={'textAlign': 'center', 'font-weight': 'bold', 'color': 'black'}),
+                create_kruskal_table(),
+            ], width=12)
+        ], style={'marginBottom': '50px'}),
+
+        dbc.Row([
+            dbc.Col([
+                html.H4("How We Did It: A Peek Behind The Curtain",
+                        style={'textAlign': 'left', 'font-weight': 'bold', 'color': 'black'}),
+                faq_section,
+            ], width=12)
+        ], style={'marginBottom': '30px', 'marginTop': '30px'}),
+
+        dbc.Row([
+            dbc.Col([
+                dcc.Link('Want more? Return to the main page', href='/')
+            ], width=12, style={'textAlign': 'center', 'marginBottom': '30px', 'marginTop': '30px'}),
+        ]),
     ])
-])
-
-@callback(
-    [Output(component_id='keywords_barplot', component_property='figure'),
-     Output(component_id='edge_bet_percentiles_plot', component_property='figure')],
-    [Input(component_id='dummy-input', component_property='value')]
-)
-
-def update_output(dummy_value):
-    # Top 5 Keywords Bar Plot
-    keywords_barplot = create_top_7_keywords_barplot()
-
-    # Edge Betweenness Percentiles Plot
-    edge_bet_percentiles_plot = create_edge_bet_percentiles_plot()
-
-    return keywords_barplot, edge_bet_percentiles_plot
 
 
 def create_top_7_keywords_barplot():
+    with metrics.span('polarization.read_barplot'):
+        barplottolo = pd.read_csv(BARPLOT_CSV)
     # Create the bar plot
     fig = go.Figure(go.Bar(x=barplottolo['top_keywords'], y=barplottolo['top_occurrences']))
     fig.update_layout(
@@ -154,23 +139,23 @@ def create_top_7_keywords_barplot():
 
 
 def create_edge_bet_percentiles_plot():
-    percs = np.linspace(80, 100, 500)
+    accademia_della_kruskal = datastore.kruskal_arrays()
+    # only the top of the 80-100 grid is plotted, so only those percentiles are computed
+    percs = np.linspace(80, 100, 500)[450:]
     fig = go.Figure()
 
-    for idx, (keyword, df) in enumerate(accademia_della_kruskal.items()):
-        edges_agreement = df.loc[df.agreement == 1].edge_bet.values
-        edges_disagreement = df.loc[df.agreement == -1].edge_bet.values
-
-        qn_edges_agreement = np.percentile(edges_agreement, percs)
-        qn_edges_disagreement = np.percentile(edges_disagreement, percs)
+    for idx, keyword in enumerate(accademia_della_kruskal):
+        with metrics.span('polarization.percentiles'):
+            qn_edges_agreement = edge_bet_sample(keyword, 1, percs[0]).percentile(percs)
+            qn_edges_disagreement = edge_bet_sample(keyword, -1, percs[0]).percentile(percs)
 
         fig.add_trace(
-            go.Scatter(x=percs[450:], y=qn_edges_agreement[450:], name=f"{keyword} Agreement",
+            go.Scatter(x=percs, y=qn_edges_agreement, name=f"{keyword} Agreement",
                        visible=True if idx == 0 else "legendonly")
         )
 
         fig.add_trace(
-            go.Scatter(x=percs[450:], y=qn_edges_disagreement[450:], name=f"{keyword} Disagreement",
+            go.Scatter(x=percs, y=qn_edges_disagreement, name=f"{keyword} Disagreement",
                        visible=True if idx == 0 else "legendonly")
         )
 
@@ -196,6 +181,40 @@ def create_edge_bet_percentiles_plot():
     return fig
 
 
+def create_kruskal_table():
+    # H and p-value per keyword, with the bootstrap interval of H when tools.kruskal_stats has been run
+    with metrics.span('polarization.kruskal_table'):
+        table = cached_kruskal_table()
+    shown = pd.DataFrame({
+        'Keyword': table['keyword'],
+        'Agreement edges': table['n_agreement'],
+        'Disagreement edges': table['n_disagreement'],
+        'H': table['H'].map('{:.2f}'.format),
+        'p-value': table['p_value'].map('{:.2e}'.format),
+    })
+    if 'H_low' in table:
+        shown['H 95% interval'] = [f'{low:.2f} - {high:.2f}' for low, high in zip(table['H_low'], table['H_high'])]
+    return dbc.Table.from_dataframe(shown, striped=True, bordered=True, hover=True, size='sm')
+
+
+# Static figures of the page, rebuilt only when their source file changes
+FIGURE_BUILDERS = {
+    'keywords_barplot': create_top_7_keywords_barplot,
+    'edge_bet_percentiles_plot': create_edge_bet_percentiles_plot,
+}
+FIGURE_SOURCES = {
+    'keywords_barplot': BARPLOT_CSV,
+    'edge_bet_percentiles_plot': datastore.KRUSKAL_PICKLE,
+}
+polarization_figures = FigureCache(
+    'polarization',
+    lambda name: FIGURE_BUILDERS[name](),
+    version=lambda name: file_hash(FIGURE_SOURCES[name]),
+)
+warmup.register('polarization figures', lambda: polarization_figures.warm(FIGURE_BUILDERS))
+warmup.register('kruskal table', cached_kruskal_table)
+
+
 @callback(
     Output("faq_collapse", "is_open"),
     [Input("faq_toggle", "n_clicks")],
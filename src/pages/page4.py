@@ -1,50 +1,48 @@
 import dash
-from dash import dcc, html, Input, Output, State, callback
+from dash import dcc, html, Input, Output, State, callback, clientside_callback, ClientsideFunction, ctx
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 import pandas as pd
+import numpy as np
 import json
-import networkx as nx
-import plotly.express as px
 import os
-import matplotlib.pyplot as plt
-cmap = plt.get_cmap('viridis')
-
-#setting the path to call datasets and images 
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-dname = dname.replace("\\", "/")
-os.chdir(dname)
+from pages.figure_cache import FigureCache, file_hash
+from pages.community_index import build_community_index
+from pages.network import build_community_graph, build_reply_graph, community_layout
+from pages import datastore, metrics, warmup
+from pages.level_of_detail import TRACE_BUDGET, aggregate_edges, select_edges, view_ranges, width_classes
+from pages.time_index import (DAY, build_day_buckets, day_range, weighted_percentiles, window_counts, window_rows,
+                               window_slice)
+from pages.user_index import prefix_search, user_summary
+from pages.viridis import viridis
 
 dash.register_page(__name__, name='Relationships')
 
+# How edges are drawn: 'batched' packs all edges of one colour into a single trace,
+# 'webgl' does the same with Scattergl and 'per_edge' draws one trace per edge.
+# 'lod' collapses the posts between two communities into weighted edges, draws the top ones by edge betweenness
+# and more of them when zooming in or clicking a community (budgets in pages/level_of_detail.py)
+EDGE_MODE = os.environ.get('NETWORK_EDGE_MODE', 'batched')
+# Decimals kept in the node and edge coordinates sent to the browser, e.g. NETWORK_COORDINATE_PRECISION=3.
+# The layouts span [-1, 1], so 3 decimals are below a pixel on any screen. Unset keeps full floats.
+COORDINATE_PRECISION = os.environ.get('NETWORK_COORDINATE_PRECISION')
+COORDINATE_PRECISION = int(COORDINATE_PRECISION) if COORDINATE_PRECISION else None
+# NETWORK_CLIENTSIDE=1 sends the compact graph data of every keyword with the page and the browser builds the
+# figure when the keyword changes (assets/network.js), without calling the server
+CLIENTSIDE = os.environ.get('NETWORK_CLIENTSIDE', '0') == '1'
 
-# Read CSV data
-data_files = os.listdir('data')
-keywords = [f[10:-4] for f in data_files if f.startswith('community_') and f.endswith('.csv')]
 
-# Convert the CSV files to dataframes
-result_dfs_edge_betweenness = {}
+# Keywords come from the csv files, the data itself is loaded lazily by the datastore
+keywords = datastore.community_keywords()
 
-for keyword in keywords:
-    result_dfs_edge_betweenness[keyword] = pd.read_csv(f"data/community_{keyword}.csv")
 
-layout = dbc.Container([
-    # Rest of your layout code...
-    dbc.Row([
-        dbc.Col([
-            dcc.Dropdown(
-                id='keyword-dropdown',
-                options=[{"label": kw, "value": kw} for kw in result_dfs_edge_betweenness.keys()],
-                value=keywords[0],
-                clearable=False,
-            ),
-        ], width={'size':6, 'offset':3}, style={'marginBottom': '30px'})
-    ]),
+def community_index(keyword):
+    # Top user, posts and members of every modularity class of a keyword
+    return datastore.keyword_memoize('community_index', keyword,
+                                     lambda: build_community_index(datastore.load_community(keyword)))
 
-    # Rest of your layout code...
-], fluid=True)
-layout = dbc.Container([
+
+page_layout = dbc.Container([
     dbc.Row([
         dbc.Col([
             html.H1('Unraveling Relationships: A Keyword-Centric Network',
@@ -62,19 +60,51 @@ layout = dbc.Container([
         dbc.Col([
             dcc.Dropdown(
                 id='keyword-dropdown',
-                options=[{"label": kw, "value": kw} for kw in result_dfs_edge_betweenness.keys()],
+                options=[{"label": kw, "value": kw} for kw in keywords],
                 value=keywords[0],
                 clearable=False,
             ),
         ], width={'size': 6, 'offset': 3}, style={'marginBottom': '30px'})
     ]),
 
+    # days of posts shown, the range of the keyword is set when it is selected
+    *([] if CLIENTSIDE else [dbc.Row([
+        dbc.Col([
+            dcc.RangeSlider(id='time-window', step=1, allowCross=False, updatemode='mouseup',
+                            tooltip={'placement': 'bottom'}),
+        ], width={'size': 10, 'offset': 1}, style={'marginBottom': '30px'})
+    ])]),
+
     dbc.Row([
         dbc.Col([
             dcc.Graph(id='network-graph'),
         ], width=12)
     ], style={'marginBottom': '30px'}),
 
+    # edge betweenness of the posts of the selected days
+    *([] if CLIENTSIDE else [dbc.Row([
+        dbc.Col([
+            dcc.Graph(id='window-percentiles'),
+        ], width=12)
+    ], style={'marginBottom': '30px'})]),
+
+    # replies inside the community of a clicked node
+    dbc.Row([
+        dbc.Col([
+            html.Div(id='community-drilldown'),
+        ], width=12)
+    ], style={'marginBottom': '30px'}),
+
+    # the communities of a user in every keyword, searched as the name is typed
+    dbc.Row([
+        dbc.Col([
+            html.H4('Find a user', style={'textAlign': 'center', 'font-weight': 'bold'}),
+            dcc.Input(id='user-search', type='search', placeholder='Username or its first letters',
+                      style={'width': '100%', 'marginBottom': '15px'}),
+            html.Div(id='user-search-results'),
+        ], width={'size': 6, 'offset': 3})
+    ], style={'marginBottom': '30px'}),
+
     dbc.Row([
         dbc.Col([
             dcc.Link('Eager for more insights? Return to the main page', href='/')
@@ -83,78 +113,377 @@ layout = dbc.Container([
 ], fluid=True)
 
 
-def get_most_active_user(df, modularity_class):
-    # Filter dataframe for specific modularity class
-    df_filtered = df[(df['SourceModularity'] == modularity_class) |
-                     (df['TargetModularity'] == modularity_class)]
+def create_edge_traces_per_edge(G, pos, colors):
+    edge_traces = []
 
-    # Count the number of posts for each user
-    user_counts = df_filtered['originalUsernamePost'].value_counts()
+    for edge in G.edges:
+        x0, y0 = pos[edge[0]]
+        x1, y1 = pos[edge[1]]
+        edge_color = colors[G.edges[edge]['agreement']]
+
+        edge_trace = go.Scatter(
+            x=[x0, x1, None],  # List of x-coordinates
+            y=[y0, y1, None],  # List of y-coordinates
+            line=dict(width=0.5, color=edge_color),  # Line color for this edge
+            hoverinfo='none',
+            mode='lines'
+        )
 
-    # The most active user is the one with the most posts
-    most_active_user = user_counts.idxmax()
+        edge_traces.append(edge_trace)
+    return edge_traces
 
-    return most_active_user
 
+def create_edge_traces_batched(G, pos, colors, webgl=False):
+    # One trace per colour: segments are laid out as x0, x1, NaN so plotly breaks the line between edges
+    if G.number_of_edges() == 0:
+        return []
 
-def create_network_graph(keyword, df):
-    # Group the data by SourceModularity and TargetModularity
-    grouped = df.groupby(['SourceModularity', 'TargetModularity'])
-    filtered_groups = [(name, group) for name, group in grouped if name[0] != name[1]]
+    nodes = list(G.nodes)
+    node_index = {node: i for i, node in enumerate(nodes)}
+    coords = np.array([pos[node] for node in nodes], dtype=float)
 
-    # Create a NetworkX graph from the filtered DataFrame
-    G = nx.from_pandas_edgelist(
-        pd.concat([group for _, group in filtered_groups]),
-        'SourceModularity',
-        'TargetModularity',
-        edge_attr=['agreement', 'edge_bet'],  # Add 'agreement' and 'edge_bet' attributes
-        create_using=nx.DiGraph()
-    )
-    pos = nx.spring_layout(G, seed=42)
+    edges = list(G.edges(data='agreement'))
+    sources = np.fromiter((node_index[u] for u, _, _ in edges), dtype=np.intp, count=len(edges))
+    targets = np.fromiter((node_index[v] for _, v, _ in edges), dtype=np.intp, count=len(edges))
+    agreement = np.fromiter((a for _, _, a in edges), dtype=np.int64, count=len(edges))
 
-    # Colors for nodes and edges
-    colors = {-1: "red", 1: "green"}
-    edge_colors = [colors[G.edges[edge]['agreement']] for edge in G.edges]  # Get color for each edge
-    size = [G.edges[edge]['edge_bet'] * 10 for edge in G.edges]
+    scatter = go.Scattergl if webgl else go.Scatter
+    edge_traces = []
 
+    for value, edge_color in colors.items():
+        mask = agreement == value
+        if not mask.any():
+            continue
+
+        segments = np.full((mask.sum(), 3, 2), np.nan)
+        segments[:, 0] = coords[sources[mask]]
+        segments[:, 1] = coords[targets[mask]]
+
+        edge_traces.append(scatter(
+            x=segments[:, :, 0].ravel(),
+            y=segments[:, :, 1].ravel(),
+            line=dict(width=0.5, color=edge_color),
+            hoverinfo='none',
+            mode='lines'
+        ))
+    return edge_traces
+
+
+def create_edge_traces_lod(edges, pos, colors, webgl=False):
+    # Aggregate edges with one trace per colour and line width (the width classes of the weights)
+    scatter = go.Scattergl if webgl else go.Scatter
+    edge_traces = []
+
+    for value, edge_color in colors.items():
+        for width in sorted(edges['width'].unique()):
+            group = edges[(edges['agreement'] == value) & (edges['width'] == width)]
+            if group.empty:
+                continue
+
+            segments = np.full((len(group), 3, 2), np.nan)
+            segments[:, 0] = [pos[node] for node in group['source']]
+            segments[:, 1] = [pos[node] for node in group['target']]
+
+            edge_traces.append(scatter(
+                x=segments[:, :, 0].ravel(),
+                y=segments[:, :, 1].ravel(),
+                line=dict(width=width, color=edge_color),
+                hoverinfo='none',
+                mode='lines'
+            ))
+    return edge_traces
+
+
+def with_widths(edges, colors):
+    # line width of every aggregate edge from its weight, the node trace takes one of the traces of the budget
+    classes = max(1, (TRACE_BUDGET - 1) // len(colors))
+    return edges.assign(width=width_classes(edges['weight'], classes))
+
+
+def lod_edges(df, colors):
+    # Aggregate edges of a keyword with their line width, the same for every view of the keyword
+    return with_widths(aggregate_edges(df), colors)
+
+
+def node_sizes(G):
+    # marker size of every node, from the largest edge betweenness of its edges
+    sizes = dict.fromkeys(G.nodes, 0.0)
+    for u, v, edge_bet in G.edges(data='edge_bet'):
+        sizes[u] = max(sizes[u], edge_bet * 10)
+        sizes[v] = max(sizes[v], edge_bet * 10)
+    return sizes
+
+
+def create_node_trace(G, pos, community_index, shown=None):
+    # one marker per community of the graph, or of the communities in shown. The colours follow the order of
+    # the nodes of the whole graph, so a community keeps its colour in every view.
     nodes = list(G.nodes)
     # Create a dictionary mapping each node to a color from the colormap
-    node_colors = {node: cmap(i / len(nodes)) for i, node in enumerate(nodes)}
-    # Create node trace
-    node_trace = go.Scatter(
-        x=tuple(pos[node][0] for node in G.nodes),  # Convert to tuple
-        y=tuple(pos[node][1] for node in G.nodes),  # Convert to tuple
-        text=[get_most_active_user(df, node) for node in G.nodes],
+    node_colors = {node: viridis(i / len(nodes)) for i, node in enumerate(nodes)}
+    sizes = node_sizes(G)
+    if shown is not None:
+        nodes = [node for node in nodes if node in shown]
+    return go.Scatter(
+        x=tuple(pos[node][0] for node in nodes),  # Convert to tuple
+        y=tuple(pos[node][1] for node in nodes),  # Convert to tuple
+        text=[community_index.at[node, 'top_user'] for node in nodes],
         mode='markers+text',
         hoverinfo='text',
+        # the community of a clicked node
+        customdata=nodes,
         marker=dict(
-            color=[node_colors[node] for node in G.nodes],  # Use node_colors
-            size=size,
+            color=[node_colors[node] for node in nodes],  # Use node_colors
+            size=[sizes[node] for node in nodes],
             line_width=2
         )
     )
-    # Create edge trace
-    edge_traces = []
 
-    for edge in G.edges:
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_color = colors[G.edges[edge]['agreement']]
 
-        edge_trace = go.Scatter(
-            x=[x0, x1, None],  # List of x-coordinates
-            y=[y0, y1, None],  # List of y-coordinates
-            line=dict(width=0.5, color=edge_color),  # Line color for this edge
-            hoverinfo='none',
-            mode='lines'
-        )
+def create_network_graph(keyword, df, edge_mode=EDGE_MODE, community_index=None, pos=None,
+                         precision=COORDINATE_PRECISION):
+    if community_index is None:
+        with metrics.span('network.community_index'):
+            community_index = build_community_index(df)
+
+    with metrics.span('network.community_graph'):
+        G = build_community_graph(df)
+    # use the layout stored in the artifacts when there is one
+    if pos is None:
+        with metrics.span('network.layout'):
+            pos = community_layout(G)
+    if precision is not None:
+        pos = {node: np.round(position, precision) for node, position in pos.items()}
+
+    # Colors for nodes and edges
+    colors = {-1: "red", 1: "green"}
+    node_trace = create_node_trace(G, pos, community_index)
+    # Create edge traces
+    with metrics.span('network.edge_traces'):
+        if edge_mode == 'lod':
+            # the default view, lod_figure draws the others
+            edge_traces = create_edge_traces_lod(select_edges(lod_edges(df, colors), pos), pos, colors)
+        elif edge_mode == 'per_edge':
+            edge_traces = create_edge_traces_per_edge(G, pos, colors)
+        else:
+            edge_traces = create_edge_traces_batched(G, pos, colors, webgl=edge_mode == 'webgl')
 
-        edge_traces.append(edge_trace)
     # Create a Plotly figure
-    fig = go.Figure(
-        data=[*edge_traces, node_trace],  # Unpack edge_traces and add node_trace
+    with metrics.span('network.figure'):
+        fig = go.Figure(
+            data=[*edge_traces, node_trace],  # Unpack edge_traces and add node_trace
+            layout=go.Layout(
+                title=f'Network Graph for Keyword "{keyword}"',
+                showlegend=False,
+                hovermode='closest',
+                margin=dict(b=20, l=5, r=5, t=40),
+                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
+            )
+        )
+    if edge_mode == 'lod':
+        # keep the zoom of the user when a finer figure of the same keyword replaces the current one
+        fig.update_layout(uirevision=keyword)
+
+    return fig
+
+def build_network_figure(keyword):
+    # Get the DataFrame for the selected keyword
+    df = datastore.load_community(keyword)
+
+    # Create the network graph for the selected keyword
+    return create_network_graph(keyword, df, community_index=community_index(keyword),
+                                pos=datastore.community_positions(keyword))
+
+
+# Figures only change when the csv of a keyword changes, so they are cached by keyword and file hash.
+# Bump the revision whenever create_network_graph changes its output.
+network_figures = FigureCache(
+    f'network-{EDGE_MODE}' + (f'-p{COORDINATE_PRECISION}' if COORDINATE_PRECISION is not None else ''),
+    build_network_figure,
+    version=lambda keyword: file_hash(datastore.community_csv(keyword)),
+    revision=6,
+)
+if not CLIENTSIDE:
+    warmup.register('network figures', lambda: network_figures.warm(keywords))
+
+
+def keyword_graph(keyword):
+    # community graph of a keyword, whose nodes and sizes every windowed figure draws
+    return datastore.keyword_memoize('keyword_graph', keyword,
+                                     lambda: build_community_graph(datastore.load_community(keyword)))
+
+
+def keyword_edges(keyword):
+    # aggregate edges and positions of a keyword, the same for every view and every time window
+    def load():
+        df = datastore.load_community(keyword)
+        pos = datastore.community_positions(keyword)
+        if pos is None:
+            with metrics.span('network.layout'):
+                pos = community_layout(build_community_graph(df))
+        if COORDINATE_PRECISION is not None:
+            pos = {node: np.round(position, COORDINATE_PRECISION) for node, position in pos.items()}
+        with metrics.span('network.aggregate_edges'):
+            return lod_edges(df, {-1: "red", 1: "green"}), pos
+
+    return datastore.keyword_memoize('keyword_edges', keyword, load)
+
+
+def keyword_buckets(keyword):
+    # Posts per day of every aggregate edge, summed over the days (pages/time_index.py): the edges and the
+    # percentiles of any window come from two rows of it
+    def load():
+        edges, _ = keyword_edges(keyword)
+        arrays = datastore.community_arrays(keyword)
+        rows = pd.DataFrame({'source': arrays['SourceModularity'], 'target': arrays['TargetModularity'],
+                             'agreement': arrays['agreement']})
+        keys = edges[['source', 'target', 'agreement']].astype(rows.dtypes).reset_index()
+        # posts inside a community have no aggregate edge
+        row_keys = (rows.merge(keys, how='left', on=['source', 'target', 'agreement'])['index']
+                    .fillna(-1).astype(int))
+        with metrics.span('network.day_buckets'):
+            return build_day_buckets(datastore.community_time_index(keyword), row_keys.to_numpy(), len(edges))
+
+    return datastore.keyword_memoize('keyword_buckets', keyword, load)
+
+
+def keyword_days(keyword):
+    return day_range(datastore.community_time_index(keyword))
+
+
+def is_full_window(keyword, window):
+    return not window or tuple(window) == keyword_days(keyword)
+
+
+def window_edges(keyword, window):
+    # aggregate edges with the posts of the window as weight, the whole period for a full window
+    edges, _ = keyword_edges(keyword)
+    if is_full_window(keyword, window):
+        return edges
+    counts = window_counts(keyword_buckets(keyword), *window)
+    return with_widths(edges.assign(weight=counts)[counts > 0], {-1: "red", 1: "green"})
+
+
+def day_label(day, date_format='%b %d'):
+    return pd.Timestamp(day * DAY, unit='s').strftime(date_format)
+
+
+def window_graph(keyword, window):
+    # community graph of the posts of a time window, the edges of the batched, webgl and per_edge modes
+    if is_full_window(keyword, window):
+        return keyword_graph(keyword)
+    rows = np.sort(window_rows(datastore.community_time_index(keyword), *window))
+    return build_community_graph(datastore.load_community(keyword).iloc[rows])
+
+
+def window_figure(keyword, window=None, x_range=None, y_range=None, community=None):
+    # The cached figure of the keyword with the edges of a time window (only its communities are kept) and, in
+    # the lod mode, the aggregate edges of a zoomed in view or of a selected community
+    figure = network_figures.get(keyword)
+    colors = {-1: "red", 1: "green"}
+    _, pos = keyword_edges(keyword)
+    with metrics.span('network.window_edges'):
+        if EDGE_MODE == 'lod':
+            edges = select_edges(window_edges(keyword, window), pos, x_range, y_range, community)
+            active = set(edges['source']) | set(edges['target'])
+        else:
+            G = window_graph(keyword, window)
+            active = set(G.nodes)
+    with metrics.span('network.edge_traces'):
+        if EDGE_MODE == 'lod':
+            edge_traces = create_edge_traces_lod(edges, pos, colors)
+        elif EDGE_MODE == 'per_edge':
+            edge_traces = create_edge_traces_per_edge(G, pos, colors)
+        else:
+            edge_traces = create_edge_traces_batched(G, pos, colors, webgl=EDGE_MODE == 'webgl')
+
+    node_trace = figure['data'][-1]
+    layout = figure['layout']
+    if not is_full_window(keyword, window):
+        node_trace = create_node_trace(keyword_graph(keyword), pos, community_index(keyword),
+                                       active).to_plotly_json()
+        low, high = window_slice(datastore.community_time_index(keyword), *window)
+        layout = {**layout, 'title': {**layout['title'], 'text': f'{layout["title"]["text"]}, '
+                                      f'{day_label(window[0])} to {day_label(window[1])} ({high - low} posts)'}}
+    return {**figure, 'layout': layout, 'data': [*(trace.to_plotly_json() for trace in edge_traces), node_trace]}
+
+
+# percentiles of the edge betweenness of a window
+WINDOW_PERCENTILES = np.linspace(0, 100, 101)
+
+
+def create_window_percentiles_plot(keyword, window=None):
+    # Edge betweenness percentiles of the agreeing and disagreeing posts of a window. edge_bet is the same for
+    # every post of an aggregate edge, so the percentiles come from the window counts of the edges.
+    edges, _ = keyword_edges(keyword)
+    window = tuple(window) if window else keyword_days(keyword)
+    if window[0] is None:
+        # no post with a valid date: every post of the keyword
+        counts = edges['weight'].to_numpy()
+        period = 'of all the posts'
+    else:
+        counts = window_counts(keyword_buckets(keyword), *window)
+        period = f'of the posts from {day_label(window[0])} to {day_label(window[1])}'
+    fig = go.Figure()
+    for value, name in [(1, 'Agreement'), (-1, 'Disagreement')]:
+        mask = (edges['agreement'] == value).to_numpy()
+        with metrics.span('window_percentiles.percentiles'):
+            percentiles = weighted_percentiles(edges['edge_bet'].to_numpy()[mask], counts[mask], WINDOW_PERCENTILES)
+        fig.add_trace(go.Scatter(x=WINDOW_PERCENTILES, y=percentiles, name=f"{keyword} {name}"))
+    fig.update_layout(
+        title=f'Edge betweenness {period}',
+        xaxis_title="Percentiles",
+        yaxis_title="Edge Betweenness",
+        yaxis_type="log",
+        hovermode="x"
+    )
+    return fig
+
+
+# users labelled in a drill-down figure and listed in its table
+TOP_USERS = 10
+# characters of the example post of a user shown in the table
+POST_PREVIEW = 140
+
+
+def community_members(posts, community):
+    # repliers of the source class and original posters of the target class, as in build_community_index
+    return (set(posts.loc[posts['SourceModularity'] == community, 'username'])
+            | set(posts.loc[posts['TargetModularity'] == community, 'originalUsernamePost']))
+
+
+def create_drilldown_graph(keyword, community, posts):
+    # Reply graph of the users of one community: members in colour, the users of other communities they reply
+    # to or get replies from in grey, the most active ones labelled
+    with metrics.span('drilldown.reply_graph'):
+        G = build_reply_graph(posts)
+    with metrics.span('drilldown.layout'):
+        pos = community_layout(G)
+    members = community_members(posts, community)
+    posts_per_user = posts['originalUsernamePost'].value_counts()
+    top_users = set(posts_per_user.index[:TOP_USERS])
+
+    nodes = list(G.nodes)
+    node_trace = go.Scatter(
+        x=tuple(pos[node][0] for node in nodes),
+        y=tuple(pos[node][1] for node in nodes),
+        text=[node if node in top_users else '' for node in nodes],
+        hovertext=[f'{node}: {posts_per_user.get(node, 0)} posts' for node in nodes],
+        mode='markers+text',
+        textposition='top center',
+        hoverinfo='text',
+        marker=dict(
+            color=[viridis(0.3) if node in members else 'lightgrey' for node in nodes],
+            size=[8 + 2 * np.sqrt(posts_per_user.get(node, 0)) for node in nodes],
+            line_width=1
+        )
+    )
+    edge_traces = create_edge_traces_batched(G, pos, {-1: "red", 1: "green"})
+
+    return go.Figure(
+        data=[*edge_traces, node_trace],
         layout=go.Layout(
-            title=f'Network Graph for Keyword "{keyword}"',
+            title=f'Replies of community {community} for Keyword "{keyword}"',
             showlegend=False,
             hovermode='closest',
             margin=dict(b=20, l=5, r=5, t=40),
@@ -163,18 +492,247 @@ def create_network_graph(keyword, df):
         )
     )
 
-    return fig
 
-# Define the callback for updating the network graph
+def create_top_users_table(keyword, posts, community):
+    members = community_members(posts, community)
+    users = pd.DataFrame({
+        'Posts': posts['originalUsernamePost'].value_counts(),
+        'Replies': posts['username'].value_counts(),
+    }).fillna(0).astype(int)
+    users = users.sort_values(['Posts', 'Replies'], ascending=False, kind='stable').head(TOP_USERS)
+
+    # the first post of every user in the community, only these rows of the text column are read
+    first_rows = posts.reset_index().groupby('originalUsernamePost')['index'].min()
+    posters = [user for user in users.index if user in first_rows.index]
+    texts = dict(zip(posters, datastore.community_text(keyword, 'originalTweetContent',
+                                                       [first_rows[user] for user in posters])))
+    shown = pd.DataFrame({
+        'User': users.index,
+        'Posts': users['Posts'],
+        'Replies': users['Replies'],
+        'Member': ['yes' if user in members else 'no' for user in users.index],
+        'Example post': [texts.get(user, '')[:POST_PREVIEW] for user in users.index],
+    })
+    return dbc.Table.from_dataframe(shown, striped=True, bordered=True, hover=True, size='sm')
+
+
+# The posts of a community come from the row index of the keyword (datastore.community_posts), so a drill-down
+# never filters the whole keyword, and its figure with the layout of the reply graph is cached like the others
+drilldown_figures = FigureCache(
+    'drilldown',
+    lambda key: create_drilldown_graph(*key, datastore.community_posts(*key)),
+    version=lambda key: file_hash(datastore.community_csv(key[0])),
+    max_size=64,
+)
+
+
+def create_drilldown(keyword, community):
+    with metrics.span('drilldown.posts'):
+        posts = datastore.community_posts(keyword, community)
+    if posts.empty:
+        return None
+    figure = drilldown_figures.get((keyword, community))
+    with metrics.span('drilldown.table'):
+        table = create_top_users_table(keyword, posts, community)
+    return [
+        html.H4(f'Inside community {community}', style={'textAlign': 'center', 'font-weight': 'bold'}),
+        html.P(f'{len(posts)} posts between {len(community_members(posts, community))} members and the communities '
+               f'they talk with. Click another node to switch community.', style={'textAlign': 'center'}),
+        dcc.Graph(figure=figure),
+        table,
+    ]
+
+
 @callback(
-    Output('network-graph', 'figure'),
-    Input('keyword-dropdown', 'value')
+    Output('community-drilldown', 'children'),
+    Input('network-graph', 'clickData'),
+    Input('keyword-dropdown', 'value'),
 )
-def update_graph(selected_keyword):
-    # Get the DataFrame for the selected keyword
-    df = result_dfs_edge_betweenness[selected_keyword]
+def show_drilldown(click_data, selected_keyword):
+    if ctx.triggered_id == 'keyword-dropdown' or not click_data:
+        return None
+    community = click_data['points'][0].get('customdata')
+    if community is None:
+        # an edge
+        return dash.no_update
+    return create_drilldown(selected_keyword, community)
 
-    # Create the network graph for the selected keyword
-    figure = create_network_graph(selected_keyword, df)
 
-    return figure
+# users listed under the result of a search
+USER_MATCHES = 10
+
+
+def create_user_search_results(query):
+    # The user with that name, or the first one starting with it, and the other users starting with it
+    query = (query or '').strip().lstrip('@')
+    if not query:
+        return None
+    index = datastore.user_index()
+    matches, total = prefix_search(index, query, USER_MATCHES)
+    summary = user_summary(index, query) or (user_summary(index, matches[0]) if matches else None)
+    if summary is None:
+        return html.P(f'No user starts with "{query}".', style={'textAlign': 'center'})
+
+    communities = pd.DataFrame(summary['communities'])
+    table = pd.DataFrame({
+        'Keyword': communities['keyword'],
+        'Community': communities['community'],
+        'Posts': communities['posts'],
+        'Agreeing': communities['agree'],
+        'Disagreeing': communities['disagree'],
+    })
+    children = [
+        html.P(f"{summary['username']}: {summary['posts']} posts in {len(communities)} communities of "
+               f"{communities['keyword'].nunique()} keywords, {summary['agree']} agreeing and "
+               f"{summary['disagree']} disagreeing."),
+        dbc.Table.from_dataframe(table, striped=True, bordered=True, hover=True, size='sm'),
+    ]
+    others = [user for user in matches if user != summary['username']]
+    if others:
+        more = f' and {total - len(matches)} more' if total > len(matches) else ''
+        children.append(html.P(f'Also starting with "{query}": {", ".join(others)}{more}.'))
+    return children
+
+
+@callback(
+    Output('user-search-results', 'children'),
+    Input('user-search', 'value'),
+)
+def search_users(query):
+    return create_user_search_results(query)
+
+
+def create_network_data(keyword, df, community_index=None, pos=None, precision=COORDINATE_PRECISION):
+    # The same graph as create_network_graph in compact form: node arrays and edge index arrays, from which
+    # buildFigure in assets/network.js makes the figure of the batched (or webgl) edge mode
+    if community_index is None:
+        community_index = build_community_index(df)
+
+    G = build_community_graph(df)
+    if pos is None:
+        pos = community_layout(G)
+    # 4 decimals are far below a pixel for a layout spanning [-1, 1]
+    precision = 4 if precision is None else precision
+
+    nodes = list(G.nodes)
+    node_index = {node: i for i, node in enumerate(nodes)}
+    coords = np.round(np.array([pos[node] for node in nodes], dtype=float), precision)
+    edges = list(G.edges(data=True))
+    return {
+        'title': f'Network Graph for Keyword "{keyword}"',
+        'x': coords[:, 0].tolist(),
+        'y': coords[:, 1].tolist(),
+        'text': [community_index.at[node, 'top_user'] for node in nodes],
+        'community': [int(node) for node in nodes],
+        'color': [list(viridis(i / len(nodes))) for i in range(len(nodes))],
+        'size': list(node_sizes(G).values()),
+        'source': [node_index[u] for u, _, _ in edges],
+        'target': [node_index[v] for _, v, _ in edges],
+        'agreement': [int(data['agreement']) for _, _, data in edges],
+    }
+
+
+def build_network_data(keyword):
+    return create_network_data(keyword, datastore.load_community(keyword), community_index=community_index(keyword),
+                               pos=datastore.community_positions(keyword))
+
+
+if CLIENTSIDE:
+    network_data = FigureCache(
+        'network-data' + (f'-p{COORDINATE_PRECISION}' if COORDINATE_PRECISION is not None else ''),
+        build_network_data,
+        version=lambda keyword: file_hash(datastore.community_csv(keyword)),
+        revision=4,
+    )
+    warmup.register('network data', lambda: network_data.warm(keywords))
+
+    # the plotly template of the server figures, so that both look the same
+    FIGURE_TEMPLATE = json.loads(go.Figure().to_json())['layout']['template']
+
+    def layout(**kwargs):
+        return html.Div([
+            dcc.Store(id='network-data', data={
+                'template': FIGURE_TEMPLATE,
+                'colors': [[-1, 'red'], [1, 'green']],
+                'webgl': EDGE_MODE == 'webgl',
+                'keywords': {keyword: network_data.get(keyword) for keyword in keywords},
+            }),
+            page_layout,
+        ])
+
+    clientside_callback(
+        ClientsideFunction(namespace='network', function_name='buildFigure'),
+        Output('network-graph', 'figure'),
+        Input('keyword-dropdown', 'value'),
+        State('network-data', 'data'),
+    )
+elif EDGE_MODE == 'lod':
+    layout = page_layout
+
+    # The default view comes from the figure cache, zooming in (relayoutData) and clicking a community (clickData)
+    # build a figure with the edges of that view. A new keyword or a double click (autorange) go back to the
+    # default view and clear the zoom and the selected community.
+    @callback(
+        Output('network-graph', 'figure'),
+        Output('network-graph', 'clickData'),
+        Output('network-graph', 'relayoutData'),
+        Input('keyword-dropdown', 'value'),
+        Input('time-window', 'value'),
+        Input('network-graph', 'relayoutData'),
+        Input('network-graph', 'clickData'),
+    )
+    def update_graph(selected_keyword, window, relayout_data, click_data):
+        triggered = ctx.triggered_prop_ids
+        reset = relayout_data and 'network-graph.relayoutData' in triggered and 'xaxis.autorange' in relayout_data
+        if 'keyword-dropdown.value' in triggered or reset:
+            relayout_data = click_data = None
+            cleared = None
+        else:
+            cleared = dash.no_update
+
+        x_range, y_range = view_ranges(relayout_data)
+        community = click_data['points'][0].get('customdata') if click_data else None
+        if x_range is None and y_range is None and community is None and is_full_window(selected_keyword, window):
+            return network_figures.get(selected_keyword), cleared, cleared
+
+        return window_figure(selected_keyword, window, x_range, y_range, community), cleared, cleared
+else:
+    layout = page_layout
+
+    # Define the callback for updating the network graph
+    @callback(
+        Output('network-graph', 'figure'),
+        Input('keyword-dropdown', 'value'),
+        Input('time-window', 'value'),
+    )
+    def update_graph(selected_keyword, window):
+        if is_full_window(selected_keyword, window):
+            return network_figures.get(selected_keyword)
+        return window_figure(selected_keyword, window)
+
+if not CLIENTSIDE:
+    # the slider spans the days of the keyword, with a mark per week (per day for a short period)
+    @callback(
+        Output('time-window', 'min'),
+        Output('time-window', 'max'),
+        Output('time-window', 'value'),
+        Output('time-window', 'marks'),
+        Output('time-window', 'disabled'),
+        Input('keyword-dropdown', 'value'),
+    )
+    def update_time_window(selected_keyword):
+        first, last = keyword_days(selected_keyword)
+        if first is None:
+            # no post with a valid date: the whole period only
+            return None, None, None, {}, True
+        step = 1 if last - first <= 10 else 7
+        marks = {day: day_label(day) for day in range(first, last + 1, step)}
+        return first, last, [first, last], marks, False
+
+    @callback(
+        Output('window-percentiles', 'figure'),
+        Input('keyword-dropdown', 'value'),
+        Input('time-window', 'value'),
+    )
+    def update_window_percentiles(selected_keyword, window):
+        return create_window_percentiles_plot(selected_keyword, window)
@@ -0,0 +1,19 @@
+import os
+
+# Every file read by the app is resolved from here, from the location of the package and never from the
+# working directory, so no module has to chdir and threads can load data at any time.
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# DATA_ROOT points the app to another copy of the datasets (community_<keyword>.csv, the Kruskal pickle...)
+DATA_DIR = os.path.abspath(os.environ.get('DATA_ROOT') or os.path.join(PACKAGE_DIR, 'data'))
+# files generated from the datasets, DATA_ARTIFACTS_DIR / FIGURE_CACHE_DIR move them when DATA_ROOT is read-only
+ARTIFACTS_DIR = os.environ.get('DATA_ARTIFACTS_DIR') or os.path.join(DATA_DIR, 'artifacts')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+# images and stylesheets served by Dash, and their optimized copies written by `python -m tools.build_assets`
+ASSETS_DIR = os.path.join(os.path.dirname(PACKAGE_DIR), 'assets')
+ASSET_BUILD_DIR = os.environ.get('ASSET_BUILD_DIR') or os.path.join(os.path.dirname(PACKAGE_DIR), 'asset_build')
+
+
+def data_path(*parts):
+    return os.path.join(DATA_DIR, *parts)
@@ -0,0 +1,66 @@
+import threading
+
+import numpy as np
+
+from pages import datastore
+from pages.figure_cache import file_hash
+
+
+class SortedSample:
+    # Sorts the values once, then answers any percentile grid by indexing into the sorted array.
+    # Results are identical to np.percentile(values, q) with the default linear interpolation.
+    # With min_percentile only the values from that percentile up are kept: they are split off with
+    # np.partition in linear time and only that tail is sorted.
+
+    def __init__(self, values, min_percentile=0):
+        values = np.asarray(values, dtype=float)
+        self.n = len(values)
+        self.min_percentile = min_percentile
+        self.offset = 0
+        if min_percentile > 0 and self.n > 1:
+            self.offset = max(0, int(np.floor((self.n - 1) * (min_percentile / 100))) - 1)
+            values = np.partition(values, self.offset)[self.offset:]
+        self.values = np.sort(values)
+
+    def __len__(self):
+        return self.n
+
+    def percentile(self, q):
+        n = self.n
+        q = np.asarray(q, dtype=float)
+        if np.any(q < self.min_percentile):
+            raise ValueError(f"percentiles below {self.min_percentile} were not kept")
+        quantiles = np.true_divide(q, 100)
+        # same virtual index and interpolation as numpy's 'linear' method
+        virtual = (n - 1) * quantiles
+        previous = np.floor(virtual)
+        gamma = virtual - np.clip(previous, 0, n - 1)
+        previous = np.clip(previous.astype(np.intp), 0, n - 1)
+        following = np.clip(previous + 1, 0, n - 1)
+
+        a = self.values[previous - self.offset]
+        b = self.values[following - self.offset]
+        diff_b_a = b - a
+        result = np.add(a, diff_b_a * gamma)
+        np.subtract(b, diff_b_a * (1 - gamma), out=result, where=gamma >= 0.5)
+        return result
+
+
+_samples = {}
+_samples_lock = threading.Lock()
+
+
+def edge_bet_sample(keyword, agreement, min_percentile=0):
+    # Sorted edge betweenness of one keyword and agreement class (1 or -1), sorted once per data version
+    version = file_hash(datastore.KRUSKAL_PICKLE)
+    key = (keyword, agreement, min_percentile)
+    with _samples_lock:
+        cached = _samples.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    arrays = datastore.kruskal_arrays()[keyword]
+    sample = SortedSample(arrays['edge_bet'][arrays['agreement'] == agreement], min_percentile)
+    with _samples_lock:
+        _samples[key] = (version, sample)
+    return sample
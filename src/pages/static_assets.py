@@ -0,0 +1,84 @@
+import json
+import mimetypes
+import os
+
+import flask
+from dash import html
+
+from pages.figure_cache import file_hash
+from pages.paths import ASSET_BUILD_DIR
+
+# the optimized files are served here, their names change with their content so they never expire
+URL_PREFIX = '/static-assets/'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+
+_manifest = (None, {})
+
+
+def manifest():
+    # manifest.json of `python -m tools.build_assets`, empty when the assets were not built
+    global _manifest
+    path = os.path.join(ASSET_BUILD_DIR, 'manifest.json')
+    if not os.path.exists(path):
+        return {}
+    version = file_hash(path)
+    if _manifest[0] != version:
+        with open(path) as f:
+            _manifest = (version, json.load(f))
+    return _manifest[1]
+
+
+def stylesheets():
+    # hashed urls of the stylesheets of the assets folder, in the order Dash would include them
+    return [URL_PREFIX + entry['file'] for name, entry in sorted(manifest().get('text', {}).items())
+            if name.endswith('.css')]
+
+
+def responsive_image(name, sizes='100vw', **props):
+    # <picture> with AVIF and WebP sources and a PNG fallback, each with every width of the image, so that the
+    # browser downloads the smallest file that fills `sizes`. Falls back to the original file in assets/.
+    entry = manifest().get('images', {}).get(name)
+    if entry is None:
+        return html.Img(src=f'assets/{name}', **props)
+
+    def srcset(image_format):
+        return ', '.join(f'{URL_PREFIX}{file} {width}w' for width, file, _ in entry['variants'][image_format])
+
+    sources = [html.Source(type=f'image/{image_format}', srcSet=srcset(image_format), sizes=sizes)
+               for image_format in ['avif', 'webp'] if image_format in entry['variants']]
+    fallback = entry['variants']['png']
+    return html.Picture([
+        *sources,
+        html.Img(src=URL_PREFIX + fallback[-1][1], srcSet=srcset('png'), sizes=sizes, **props),
+    ])
+
+
+def send_asset(filename):
+    path = os.path.join(ASSET_BUILD_DIR, filename)
+    if filename == 'manifest.json' or not os.path.isfile(path):
+        flask.abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = flask.request.headers.get('Accept-Encoding', '')
+    encoding = None
+    for name, extension in ENCODINGS:
+        if name in accepted and os.path.isfile(path + extension):
+            encoding, filename = name, filename + extension
+            break
+
+    response = flask.send_from_directory(ASSET_BUILD_DIR, filename, mimetype=mimetype)
+    response.headers.pop('Content-Disposition', None)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def register_routes(server):
+    server.add_url_rule(URL_PREFIX + '<path:filename>', 'static_assets', send_asset)
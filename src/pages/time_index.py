@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+DAY = 86400
+
+
+def build_time_index(datetimes):
+    # Posting times of the rows of a keyword in increasing order (seconds) and the row of each of them, so that
+    # the rows of any time window are found by binary search. Rows without a valid datetime are left out.
+    seconds = pd.to_datetime(pd.Series(datetimes), errors='coerce')
+    valid = np.flatnonzero(seconds.notna().to_numpy())
+    seconds = seconds.to_numpy('datetime64[s]').astype('int64')[valid]
+    order = np.argsort(seconds, kind='stable')
+    return {'time_sorted': seconds[order], 'time_rows': valid[order].astype('int32')}
+
+
+def window_slice(index, start_day, end_day):
+    # positions in the time index of the rows posted from the start of start_day to the end of end_day
+    low, high = np.searchsorted(index['time_sorted'], [start_day * DAY, (end_day + 1) * DAY])
+    return low, high
+
+
+def window_rows(index, start_day, end_day):
+    low, high = window_slice(index, start_day, end_day)
+    return index['time_rows'][low:high]
+
+
+def day_range(index):
+    # first and last day (days since 1970-01-01) with posts
+    if len(index['time_sorted']) == 0:
+        return None, None
+    return int(index['time_sorted'][0] // DAY), int(index['time_sorted'][-1] // DAY)
+
+
+def build_day_buckets(index, row_keys, key_count):
+    # Posts per day and key (e.g. the aggregate edge of every row), summed over the days: the counts of any
+    # window of days are the difference of two rows, without going through the posts again. Rows with a
+    # negative key are not counted.
+    keys = np.asarray(row_keys)[index['time_rows']]
+    days_of_rows = index['time_sorted'] // DAY
+    counted = keys >= 0
+    days, day_positions = np.unique(days_of_rows[counted], return_inverse=True)
+    counts = np.bincount(day_positions * key_count + keys[counted], minlength=len(days) * key_count)
+    cumulative = np.zeros((len(days) + 1, key_count), dtype='int64')
+    np.cumsum(counts.reshape(len(days), key_count), axis=0, out=cumulative[1:])
+    return {'days': days, 'cumulative': cumulative}
+
+
+def window_counts(buckets, start_day, end_day):
+    # counts of every key in the window, from the day buckets
+    low = np.searchsorted(buckets['days'], start_day, side='left')
+    high = np.searchsorted(buckets['days'], end_day, side='right')
+    return buckets['cumulative'][high] - buckets['cumulative'][low]
+
+
+def weighted_percentiles(values, counts, percentiles):
+    # np.percentile of values repeated counts times (linear interpolation), without repeating them
+    order = np.argsort(values, kind='stable')
+    values = np.asarray(values, dtype=float)[order]
+    counts = np.asarray(counts)[order]
+    values, counts = values[counts > 0], counts[counts > 0]
+    if len(values) == 0:
+        return np.full(len(percentiles), np.nan)
+    ends = np.cumsum(counts)
+    positions = np.asarray(percentiles, dtype=float) / 100 * (ends[-1] - 1)
+    below = np.floor(positions)
+    # value at position p of the repeated array is the first value whose run ends after p
+    low = values[np.searchsorted(ends, below, side='right')]
+    high = values[np.minimum(np.searchsorted(ends, below + 1, side='right'), len(values) - 1)]
+    return low + (positions - below) * (high - low)
@@ -0,0 +1,154 @@
+import time
+
+import flask
+import numpy as np
+import pandas as pd
+
+# arrays of the index, stored with the artifacts
+INDEX_ARRAYS = ['keywords', 'users', 'user_keys', 'user_offsets', 'entry_keyword', 'entry_community', 'entry_posts',
+                'entry_agree', 'entry_disagree', 'entry_row_offsets', 'entry_rows']
+# most users returned by a prefix search
+MAX_PREFIX_RESULTS = 100
+# the last code point, every string starting with a prefix sorts before prefix + this
+LAST_CHARACTER = '\U0010ffff'
+
+
+def build_user_index(tables):
+    # Inverted index of the users of every keyword, from the community arrays of the keywords ({keyword: arrays}).
+    # A user belongs to the class of the rows they reply from (SourceModularity) and of the rows they are replied
+    # to in (TargetModularity), as in the drill-down. The index has
+    #   users / user_keys     the dictionary of usernames, sorted by lowercase then exact name, and the lowercase
+    #                         names in the same order for case-insensitive lookups and prefix searches
+    #   user_offsets          entries of user i are entry_*[user_offsets[i]:user_offsets[i + 1]]
+    #   entry_keyword / entry_community / entry_posts / entry_agree / entry_disagree
+    #                         one entry per user, keyword (code into `keywords`) and class, with the number of
+    #                         posts and how many of them agree
+    #   entry_row_offsets     rows of entry j in the arrays of its keyword are
+    #                         entry_rows[entry_row_offsets[j]:entry_row_offsets[j + 1]]
+    keywords = sorted(tables)
+    names = np.unique(np.concatenate([np.asarray(tables[keyword]['users']) for keyword in keywords]).astype(str))
+    keys = np.char.lower(names)
+    order = np.lexsort((names, keys))
+    names, keys = names[order], keys[order]
+    dictionary = pd.Index(names)
+
+    parts = {'user': [], 'keyword': [], 'community': [], 'row': [], 'agreement': []}
+    for code, keyword in enumerate(keywords):
+        arrays = tables[keyword]
+        to_index = dictionary.get_indexer(np.asarray(arrays['users']))
+        username = np.asarray(arrays['username'])
+        poster = np.asarray(arrays['originalUsernamePost'])
+        source = np.asarray(arrays['SourceModularity'])
+        target = np.asarray(arrays['TargetModularity'])
+        rows = np.arange(len(username), dtype='int32')
+        # a user replying to themselves in their own class is there once for that row
+        twice = (username != poster) | (source != target)
+        parts['user'] += [to_index[username], to_index[poster[twice]]]
+        parts['keyword'] += [np.full(len(rows) + int(twice.sum()), code, dtype='int8')]
+        parts['community'] += [source, target[twice]]
+        parts['row'] += [rows, rows[twice]]
+        parts['agreement'] += [arrays['agreement'], np.asarray(arrays['agreement'])[twice]]
+    user, keyword, community, row, agreement = (
+        np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype='int32')
+        for name in ['user', 'keyword', 'community', 'row', 'agreement'])
+
+    order = np.lexsort((row, community, keyword, user))
+    user, keyword, community, row, agreement = (values[order] for values in [user, keyword, community, row,
+                                                                              agreement])
+    new_entry = np.ones(len(user), dtype=bool)
+    new_entry[1:] = (np.diff(user) != 0) | (np.diff(keyword) != 0) | (np.diff(community) != 0)
+    starts = np.flatnonzero(new_entry)
+    agree = np.add.reduceat((agreement == 1).astype('int32'), starts) if len(starts) else np.empty(0, 'int32')
+    posts = np.diff(np.append(starts, len(user))).astype('int32')
+    return {
+        'keywords': np.array(keywords, dtype=str),
+        'users': names,
+        'user_keys': keys,
+        'user_offsets': np.searchsorted(user[starts], np.arange(len(names) + 1)).astype('int64'),
+        'entry_keyword': keyword[starts].astype('int8'),
+        'entry_community': community[starts].astype('int32'),
+        'entry_posts': posts,
+        'entry_agree': agree.astype('int32'),
+        'entry_disagree': (posts - agree).astype('int32'),
+        'entry_row_offsets': np.append(starts, len(user)).astype('int64'),
+        'entry_rows': row.astype('int32'),
+    }
+
+
+def find_user(index, username):
+    # position of a user in the dictionary: the exact name, or the first with the same name in lowercase
+    key = username.lower()
+    low = np.searchsorted(index['user_keys'], key, side='left')
+    high = np.searchsorted(index['user_keys'], key, side='right')
+    for position in range(low, high):
+        if index['users'][position] == username:
+            return int(position)
+    return int(low) if low < high else None
+
+
+def prefix_search(index, prefix, limit=10):
+    # users whose lowercase name starts with the prefix, in dictionary order, and how many there are
+    key = prefix.lower()
+    low = np.searchsorted(index['user_keys'], key, side='left')
+    high = np.searchsorted(index['user_keys'], key + LAST_CHARACTER, side='left')
+    limit = min(limit, MAX_PREFIX_RESULTS)
+    return [str(name) for name in index['users'][low:min(high, low + limit)]], int(high - low)
+
+
+def user_entries(index, position, rows=False):
+    # keyword, class, posts and agreement counts of every class of a user
+    start, end = index['user_offsets'][position], index['user_offsets'][position + 1]
+    entries = []
+    for entry in range(start, end):
+        item = {
+            'keyword': str(index['keywords'][index['entry_keyword'][entry]]),
+            'community': int(index['entry_community'][entry]),
+            'posts': int(index['entry_posts'][entry]),
+            'agree': int(index['entry_agree'][entry]),
+            'disagree': int(index['entry_disagree'][entry]),
+        }
+        if rows:
+            offsets = index['entry_row_offsets']
+            item['rows'] = index['entry_rows'][offsets[entry]:offsets[entry + 1]].tolist()
+        entries.append(item)
+    return entries
+
+
+def user_summary(index, username, rows=False):
+    position = find_user(index, username)
+    if position is None:
+        return None
+    entries = user_entries(index, position, rows)
+    posts = sum(entry['posts'] for entry in entries)
+    agree = sum(entry['agree'] for entry in entries)
+    return {
+        'username': str(index['users'][position]),
+        'posts': posts,
+        'agree': agree,
+        'disagree': posts - agree,
+        'communities': entries,
+    }
+
+
+def register_routes(server, load_index):
+    # /api/users/<username>[?rows=1] the classes of a user across the keywords, /api/users?prefix=...&limit=...
+    # the users starting with a prefix. load_index returns the index (datastore.user_index).
+
+    def user_route(username):
+        start = time.perf_counter()
+        summary = user_summary(load_index(), username, rows=flask.request.args.get('rows') == '1')
+        if summary is None:
+            return flask.jsonify({'error': f'unknown user {username!r}'}), 404
+        summary['lookup_ms'] = (time.perf_counter() - start) * 1000
+        return flask.jsonify(summary)
+
+    def prefix_route():
+        start = time.perf_counter()
+        prefix = flask.request.args.get('prefix', '')
+        limit = flask.request.args.get('limit', '10')
+        users, total = prefix_search(load_index(), prefix, int(limit) if limit.isdigit() else 10)
+        return flask.jsonify({'prefix': prefix, 'total': total, 'users': users,
+                              'lookup_ms': (time.perf_counter() - start) * 1000})
+
+    server.add_url_rule('/api/users/<path:username>', 'user', user_route)
+    server.add_url_rule('/api/users', 'user_prefix', prefix_route)
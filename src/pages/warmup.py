@@ -0,0 +1,65 @@
+import logging
+import os
+import threading
+import time
+
+# What the pages build before their first request (cached figures, the Kruskal table...):
+#   eager       while the page modules are imported, the app starts once everything is built
+#   background  in a daemon thread started by app.py, the app answers right away and the first request of a
+#               page that is not ready yet builds what it needs itself
+#   lazy        nothing, every figure is built by the first request that needs it
+WARM_UP = os.environ.get('WARM_UP', 'background')
+
+logger = logging.getLogger(__name__)
+
+_tasks = []
+_lock = threading.Lock()
+_thread = None
+_done = threading.Event()
+
+
+def _run(name, function):
+    start = time.perf_counter()
+    try:
+        function()
+    except Exception:
+        # a failed warm-up only means that the first request builds the figure
+        logger.exception("warm-up of %s failed", name)
+        return
+    logger.info("warm-up of %s in %.2fs", name, time.perf_counter() - start)
+
+
+def register(name, function):
+    if WARM_UP == 'eager':
+        _run(name, function)
+    elif WARM_UP == 'background':
+        with _lock:
+            _tasks.append((name, function))
+
+
+def _run_all():
+    while True:
+        with _lock:
+            if not _tasks:
+                break
+            name, function = _tasks.pop(0)
+        _run(name, function)
+    _done.set()
+
+
+def start():
+    # With gunicorn preload_app the thread runs in the master and when_ready waits for it before the workers
+    # are forked, so they inherit the built figures. Without preload every worker warms up on its own.
+    global _thread
+    if WARM_UP != 'background':
+        _done.set()
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run_all, name='warm-up', daemon=True)
+    _thread.start()
+
+
+def wait(timeout=None):
+    return _done.wait(timeout)
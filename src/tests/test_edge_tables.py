@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from pages.datastore import compact_ints, encode_users
+
+
+def test_compact_ints():
+    assert compact_ints([0, 5, 32767]).dtype == np.int16
+    assert compact_ints([-32768, 3]).dtype == np.int16
+    assert compact_ints([0, 40000]).dtype == np.int32
+    assert compact_ints([]).dtype == np.int16
+    assert compact_ints([7, -2]).tolist() == [7, -2]
+
+
+def test_encode_users_round_trip():
+    df = pd.DataFrame({'username': ['bob', 'alice', 'Bob', 'carol'],
+                       'originalUsernamePost': ['alice', 'dave', 'bob', 123]})
+    encoded = encode_users(df)
+    users = encoded['users']
+    # one sorted dictionary for both columns
+    assert users.tolist() == sorted(set(df['username']) | set(df['originalUsernamePost'].astype(str)))
+    assert encoded['username'].dtype == encoded['originalUsernamePost'].dtype == np.int32
+    assert users[encoded['username']].tolist() == df['username'].tolist()
+    assert users[encoded['originalUsernamePost']].tolist() == df['originalUsernamePost'].astype(str).tolist()
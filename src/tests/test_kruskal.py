@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.kruskal import chi2_sf, kruskal_wallis
+
+
+def reference_h(values, labels):
+    # textbook Kruskal-Wallis H with the tie correction, ranks from pandas
+    df = pd.DataFrame({'value': values, 'label': labels})
+    df['rank'] = df['value'].rank(method='average')
+    n = len(df)
+    groups = df.groupby('label')['rank'].agg(['sum', 'size'])
+    h = 12 / (n * (n + 1)) * (groups['sum'] ** 2 / groups['size']).sum() - 3 * (n + 1)
+    ties = df['value'].value_counts().to_numpy().astype(float)
+    return h / (1 - (ties ** 3 - ties).sum() / (n ** 3 - n))
+
+
+def reference_sf(x, df):
+    # P(chi2 > x) from the regularized gamma series, slow but independent of chi2_sf
+    half, a = x / 2, df / 2
+    term = total = 1 / a
+    for i in range(1, 1000):
+        term *= half / (a + i)
+        total += term
+    return 1 - math.exp(a * math.log(half) - half - math.lgamma(a)) * total
+
+
+@pytest.mark.parametrize('df', [1, 2, 3, 4, 5, 10])
+@pytest.mark.parametrize('x', [0.1, 1, 3.84, 10, 30])
+def test_chi2_sf(x, df):
+    assert chi2_sf(x, df) == pytest.approx(reference_sf(x, df), abs=1e-9)
+
+
+def test_chi2_sf_known_values():
+    assert chi2_sf(0, 1) == 1
+    assert chi2_sf(3.841458820694124, 1) == pytest.approx(0.05)
+    assert chi2_sf(5.991464547107979, 2) == pytest.approx(0.05)
+
+
+def test_kruskal_wallis_matches_reference():
+    rng = np.random.default_rng(0)
+    # few distinct values, so that there are many ties
+    values = rng.integers(0, 20, 500).astype(float)
+    labels = rng.choice([1, -1], 500)
+    h, p = kruskal_wallis(values, labels)
+    assert h[0] == pytest.approx(reference_h(values, labels))
+    assert p[0] == pytest.approx(chi2_sf(reference_h(values, labels), 1))
+
+
+def test_kruskal_wallis_blocks():
+    # every block gives the statistic of its own rows
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(0, 1, 900).round(1)
+    labels = rng.choice([1, -1], 900)
+    blocks = rng.integers(0, 3, 900)
+    h, p = kruskal_wallis(values, labels, blocks)
+    for block in range(3):
+        rows = blocks == block
+        assert h[block] == pytest.approx(reference_h(values[rows], labels[rows]))
+
+
+def test_kruskal_wallis_single_group():
+    h, p = kruskal_wallis([1.0, 2.0, 3.0], [1, 1, 1])
+    assert np.isnan(p[0])
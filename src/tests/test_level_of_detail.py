@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from pages import level_of_detail
+from pages.level_of_detail import aggregate_edges, edge_budget, select_edges, view_ranges, width_classes
+
+
+def posts():
+    return pd.DataFrame({
+        'SourceModularity': [0, 0, 0, 1, 1, 2, 2],
+        'TargetModularity': [1, 1, 1, 2, 1, 0, 0],
+        'agreement': [1, 1, -1, 1, 1, -1, -1],
+        'edge_bet': [0.5, 0.5, 0.5, 0.2, 0.0, 0.9, 0.9],
+    })
+
+
+def test_aggregate_edges():
+    edges = aggregate_edges(posts())
+    # posts inside a class are left out, the strongest pair comes first
+    assert edges[['source', 'target', 'agreement', 'weight']].values.tolist() == [
+        [2, 0, -1, 2], [0, 1, 1, 2], [0, 1, -1, 1], [1, 2, 1, 1]]
+    assert edges['weight'].sum() == 6
+
+
+def test_select_edges_default_view(monkeypatch):
+    monkeypatch.setattr(level_of_detail, 'TOP_EDGES', 2)
+    edges = aggregate_edges(posts())
+    pos = {0: (0, 0), 1: (1, 0), 2: (0, 1)}
+    assert select_edges(edges, pos).index.tolist() == [0, 1]
+
+
+def test_select_edges_zoom_and_community():
+    edges = aggregate_edges(posts())
+    pos = {0: (0, 0), 1: (1, 0), 2: (0, 1)}
+    # only the edge from (1, 0) to (0, 1) crosses the view
+    zoomed = select_edges(edges, pos, x_range=(0.4, 0.6), y_range=(0.4, 0.6))
+    assert zoomed.index.tolist() == [3]
+    # the edges of the community come first
+    selected = select_edges(edges, pos, x_range=(0.4, 0.6), y_range=(0.4, 0.6), community=0)
+    assert selected.index.tolist() == [0, 1, 2, 3]
+
+
+def test_select_edges_budget(monkeypatch):
+    monkeypatch.setattr(level_of_detail, 'POINT_BUDGET', 3 + 6)
+    edges = aggregate_edges(posts())
+    pos = {0: (0, 0), 1: (1, 0), 2: (0, 1)}
+    assert edge_budget(len(pos)) == 2
+    assert len(select_edges(edges, pos, x_range=(-1, 2))) == 2
+
+
+def test_width_classes():
+    widths = width_classes([1, 10, 100, 1000], 4)
+    assert widths.tolist() == [level_of_detail.MIN_WIDTH, *widths[1:3], level_of_detail.MAX_WIDTH]
+    assert np.all(np.diff(widths) > 0)
+    assert np.all(width_classes([5, 5], 4) == level_of_detail.MIN_WIDTH)
+
+
+def test_view_ranges():
+    assert view_ranges(None) == (None, None)
+    assert view_ranges({'xaxis.range[0]': 1, 'xaxis.range[1]': 2, 'yaxis.autorange': True}) == ((1, 2), None)
+    assert view_ranges({'xaxis.range': [1, 2], 'yaxis.range': [3, 4]}) == ([1, 2], [3, 4])
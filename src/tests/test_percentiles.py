@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from pages.percentiles import SortedSample
+
+GRID = np.linspace(80, 100, 500)
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 1000, 100_000])
+def test_sorted_sample_matches_numpy(size):
+    values = np.random.default_rng(size).lognormal(-12, 1.5, size)
+    assert np.array_equal(SortedSample(values).percentile(GRID), np.percentile(values, GRID))
+
+
+@pytest.mark.parametrize('size', [2, 7, 1000, 100_000])
+def test_sorted_tail_matches_numpy(size):
+    # ties included, the edge betweenness of a community pair is repeated on all its posts
+    values = np.random.default_rng(size).integers(0, 50, size) / 7
+    sample = SortedSample(values, GRID[450])
+    assert np.array_equal(sample.percentile(GRID[450:]), np.percentile(values, GRID[450:]))
+
+
+def test_sorted_tail_refuses_lower_percentiles():
+    with pytest.raises(ValueError):
+        SortedSample(np.arange(100), 90).percentile([50])
@@ -0,0 +1,45 @@
+from collections import Counter
+
+import numpy as np
+
+from tools.sketches import CountMin, SpaceSaving
+
+
+def chunks():
+    # zipf-like usernames in a few chunks, as the processes of the ingestion see them
+    rng = np.random.default_rng(0)
+    names = [f'user{value}' for value in rng.zipf(1.3, 20_000) % 5000]
+    return [Counter(names[start:start + 5000]) for start in range(0, len(names), 5000)]
+
+
+def test_space_saving_bounds():
+    exact = sum(chunks(), Counter())
+    total = sum(exact.values())
+    first, second = SpaceSaving(100), SpaceSaving(100)
+    for position, chunk in enumerate(chunks()):
+        (first if position % 2 else second).merge(chunk)
+    first.merge_summary(second)
+
+    assert first.total == total
+    assert len(first.counts) <= 100
+    for item, count, error in first.top(100):
+        # the upper bound is at most `error` over the true count
+        assert count - error <= exact[item] <= count
+    # every item counted more than total / capacity times is kept
+    assert {item for item, count in exact.items() if count > total / 100} <= set(first.counts)
+
+
+def test_count_min_bounds():
+    exact = sum(chunks(), Counter())
+    total = sum(exact.values())
+    first, second = CountMin(width=1024), CountMin(width=1024)
+    for position, chunk in enumerate(chunks()):
+        (first if position % 2 else second).add(chunk)
+    first.merge(second)
+
+    items = list(exact)
+    estimates = first.estimate(items)
+    truth = np.array([exact[item] for item in items])
+    assert np.all(estimates >= truth)
+    assert np.mean(estimates - truth <= 2 * total / 1024) > 0.9
+    assert len(first.estimate([])) == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.time_index import (DAY, build_day_buckets, build_time_index, day_range, weighted_percentiles,
+                              window_counts, window_rows, window_slice)
+
+
+@pytest.fixture
+def posts():
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(18_600 * DAY, 18_660 * DAY, 2000)
+    datetimes = pd.to_datetime(seconds, unit='s').astype(str).tolist()
+    # rows without a valid date are left out of every window
+    datetimes[::97] = ['not a date'] * len(datetimes[::97])
+    keys = rng.integers(-1, 12, 2000)
+    return datetimes, keys
+
+
+def scan(datetimes, start_day, end_day):
+    # rows posted in the window, going through every row
+    days = pd.to_datetime(pd.Series(datetimes), errors='coerce')
+    days = (days - pd.Timestamp('1970-01-01')).dt.days
+    return np.flatnonzero(((days >= start_day) & (days <= end_day)).to_numpy())
+
+
+@pytest.mark.parametrize('window', [(18_600, 18_600), (18_610, 18_630), (18_500, 18_700), (18_659, 18_700),
+                                    (18_700, 18_800)])
+def test_window_rows_match_scan(posts, window):
+    datetimes, keys = posts
+    index = build_time_index(datetimes)
+    low, high = window_slice(index, *window)
+    assert high - low == len(scan(datetimes, *window))
+    assert sorted(window_rows(index, *window)) == scan(datetimes, *window).tolist()
+
+
+@pytest.mark.parametrize('window', [(18_600, 18_600), (18_610, 18_630), (18_500, 18_700), (18_700, 18_800)])
+def test_window_counts_match_scan(posts, window):
+    datetimes, keys = posts
+    index = build_time_index(datetimes)
+    buckets = build_day_buckets(index, keys, 12)
+    rows = scan(datetimes, *window)
+    expected = np.bincount(keys[rows][keys[rows] >= 0], minlength=12)
+    assert window_counts(buckets, *window).tolist() == expected.tolist()
+
+
+def test_day_range(posts):
+    datetimes, keys = posts
+    days = scan(datetimes, 0, 10 ** 6)
+    first, last = day_range(build_time_index(datetimes))
+    assert len(scan(datetimes, first, last)) == len(days)
+    assert len(scan(datetimes, first + 1, last)) < len(days) and len(scan(datetimes, first, last - 1)) < len(days)
+    assert day_range(build_time_index(['not a date'])) == (None, None)
+
+
+def test_weighted_percentiles():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(0, 1, 50)
+    counts = rng.integers(0, 5, 50)
+    q = np.linspace(80, 100, 21)
+    assert np.allclose(weighted_percentiles(values, counts, q), np.percentile(np.repeat(values, counts), q))
+    assert np.isnan(weighted_percentiles(values, np.zeros(50, dtype=int), q)).all()
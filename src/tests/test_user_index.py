@@ -0,0 +1,57 @@
+import numpy as np
+
+from pages.user_index import build_user_index, find_user, prefix_search, user_summary
+
+
+def tables():
+    # community arrays of two keywords, usernames already encoded as in the artifacts
+    return {
+        'trump': {
+            'users': np.array(['Alice', 'alice', 'bob', 'carl']),
+            'username': np.array([0, 1, 2, 2]),
+            'originalUsernamePost': np.array([2, 2, 2, 3]),
+            'SourceModularity': np.array([0, 0, 1, 1]),
+            'TargetModularity': np.array([1, 1, 1, 0]),
+            'agreement': np.array([1, -1, 1, -1]),
+        },
+        'georgia': {
+            'users': np.array(['bob', 'bobby', 'Zed']),
+            'username': np.array([1, 2]),
+            'originalUsernamePost': np.array([0, 0]),
+            'SourceModularity': np.array([3, 3]),
+            'TargetModularity': np.array([4, 4]),
+            'agreement': np.array([1, 1]),
+        },
+    }
+
+
+def test_find_user():
+    index = build_user_index(tables())
+    assert index['users'][find_user(index, 'alice')] == 'alice'
+    assert index['users'][find_user(index, 'Alice')] == 'Alice'
+    # another case falls back to the first name with the same lowercase
+    assert index['users'][find_user(index, 'ALICE')] in {'Alice', 'alice'}
+    assert index['users'][find_user(index, 'zed')] == 'Zed'
+    assert find_user(index, 'nobody') is None
+
+
+def test_prefix_search():
+    index = build_user_index(tables())
+    assert prefix_search(index, 'bo') == (['bob', 'bobby'], 2)
+    assert prefix_search(index, 'B', limit=1) == (['bob'], 2)
+    assert prefix_search(index, 'al')[1] == 2
+    assert prefix_search(index, 'x') == ([], 0)
+    assert prefix_search(index, '')[1] == len(index['users'])
+
+
+def test_user_summary():
+    index = build_user_index(tables())
+    bob = user_summary(index, 'bob', rows=True)
+    # a self reply inside one class counts once, the others for both ends
+    by_class = {(entry['keyword'], entry['community']): entry for entry in bob['communities']}
+    assert by_class[('trump', 1)]['rows'] == [0, 1, 2, 3]
+    assert by_class[('trump', 1)]['agree'] == 2
+    assert ('trump', 0) not in by_class
+    assert by_class[('georgia', 4)]['posts'] == 2
+    assert bob['posts'] == 6 and bob['agree'] + bob['disagree'] == 6
+    assert user_summary(index, 'nobody') is None
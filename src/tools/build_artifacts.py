@@ -0,0 +1,185 @@
+# Build the compact data artifacts loaded by the pages.
+# Run from the src folder: python -m tools.build_artifacts [keyword ...]
+#
+# For every community_<keyword>.csv it writes one .npy file per used column (usernames are dictionary
+# encoded into int32 codes, modularity classes take int16 when they fit, edge_bet float32), the text columns
+# as utf-8 bytes plus row offsets, the rows of every modularity class, the rows sorted by posting time and the
+# precomputed layout of the community graph. The Kruskal
+# pickle is split into agreement/edge_bet arrays per keyword. The user index (pages/user_index.py) spans every
+# keyword and is rebuilt with any of them. The pages memory-map these files and fall
+# back to the csv/pickle whenever an artifact is missing or was built from an older source file.
+#
+# The layout is computed once per community graph: when the csv changed but the graph did not, the stored
+# positions are kept, and when the graph changed they are the starting point of the new layout.
+import argparse
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from pages.community_index import build_row_index
+from pages.datastore import (ARTIFACTS_DIR, ARTIFACTS_VERSION, KRUSKAL_PICKLE, TEXT_COLUMNS, community_arrays,
+                             community_csv, community_keywords, compact_ints, encode_users, read_community_csv,
+                             read_datetimes, read_manifest, slugify, users_source_hash)
+from pages.figure_cache import file_hash
+from pages.layout import LAYOUT_ENGINE, can_warm_start, graph_hash
+from pages.network import build_community_graph, community_layout
+from pages.time_index import build_time_index
+from pages.user_index import build_user_index
+
+
+def _write_arrays(kind, keyword, arrays):
+    folder = os.path.join(ARTIFACTS_DIR, kind, slugify(keyword))
+    tmp_folder = f'{folder}.tmp'
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    os.makedirs(tmp_folder)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_folder, f'{name}.npy'), values, allow_pickle=False)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.rename(tmp_folder, folder)
+    return sum(values.nbytes for values in arrays.values())
+
+
+def previous_layout(keyword, entry):
+    # positions of the last build of a keyword, whatever its source file
+    layout = (entry or {}).get('layout')
+    folder = os.path.join(ARTIFACTS_DIR, 'community', slugify(keyword))
+    if not isinstance(layout, dict):
+        return None, None
+    try:
+        nodes = np.load(os.path.join(folder, 'layout_nodes.npy'))
+        positions = np.load(os.path.join(folder, 'layout_positions.npy'))
+    except OSError:
+        return None, None
+    return layout.get('graph_hash'), {int(node): position for node, position in zip(nodes, positions)}
+
+
+def text_arrays(keyword):
+    # every text column as one block of utf-8 bytes and the offsets of the rows in it
+    text = pd.read_csv(community_csv(keyword), dtype=str, keep_default_na=False,
+                       usecols=lambda column: column in TEXT_COLUMNS)
+    arrays = {}
+    for column in text:
+        encoded = [value.encode() for value in text[column]]
+        arrays[f'{column}_bytes'] = np.frombuffer(b''.join(encoded), dtype='uint8')
+        lengths = np.fromiter((len(value) for value in encoded), dtype='int64', count=len(encoded))
+        arrays[f'{column}_offsets'] = np.concatenate([[0], np.cumsum(lengths)]).astype('int64')
+    return arrays
+
+
+def build_community(keyword, previous=None):
+    df = read_community_csv(keyword)
+
+    # one dictionary for repliers and original posters
+    arrays = {
+        **encode_users(df),
+        'agreement': df['agreement'].to_numpy('int8'),
+        'SourceModularity': compact_ints(df['SourceModularity']),
+        'TargetModularity': compact_ints(df['TargetModularity']),
+        'edge_bet': df['edge_bet'].to_numpy('float32'),
+    }
+    arrays.update(text_arrays(keyword))
+    arrays.update(build_row_index(arrays['SourceModularity'], arrays['TargetModularity']))
+    arrays.update(build_time_index(read_datetimes(keyword)))
+
+    G = build_community_graph(df)
+    current_hash = graph_hash(G)
+    previous_hash, previous_pos = previous_layout(keyword, previous)
+    if previous_hash == current_hash:
+        pos, method = previous_pos, 'reused'
+    else:
+        pos = community_layout(G, previous_pos)
+        method = 'warm start' if can_warm_start(G, previous_pos) else LAYOUT_ENGINE
+    arrays['layout_nodes'] = np.array(list(pos), dtype='int64')
+    arrays['layout_positions'] = np.array([pos[node] for node in pos], dtype='float64').reshape(-1, 2)
+
+    nbytes = _write_arrays('community', keyword, arrays)
+    return {
+        'source_hash': file_hash(community_csv(keyword)),
+        'rows': len(df),
+        'layout': {'graph_hash': current_hash, 'method': method, 'nodes': len(pos)},
+        'bytes': nbytes,
+    }
+
+
+def build_kruskal():
+    with open(KRUSKAL_PICKLE, 'rb') as pickle_file:
+        accademia_della_kruskal = pickle.load(pickle_file)
+
+    nbytes = 0
+    for keyword, df in accademia_della_kruskal.items():
+        nbytes += _write_arrays('kruskal', keyword, {
+            'agreement': df['agreement'].to_numpy('int8'),
+            'edge_bet': df['edge_bet'].to_numpy('float64'),
+        })
+    return {
+        'source_hash': file_hash(KRUSKAL_PICKLE),
+        'keywords': list(accademia_della_kruskal),
+        'bytes': nbytes,
+    }
+
+
+def build_users():
+    keywords = community_keywords()
+    index = build_user_index({keyword: community_arrays(keyword) for keyword in keywords})
+    nbytes = _write_arrays('users', 'all', index)
+    return {
+        'source_hash': users_source_hash(),
+        'users': len(index['users']),
+        'entries': len(index['entry_posts']),
+        'bytes': nbytes,
+    }
+
+
+def write_manifest(manifest):
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    path = os.path.join(ARTIFACTS_DIR, 'manifest.json')
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+
+def build(keywords=None, kruskal=True):
+    # keep the entries of the keywords that are not rebuilt, the previous layouts are reused
+    previous = read_manifest()
+    manifest = {**previous, 'community': dict(previous.get('community', {}))} if keywords else {}
+    manifest['version'] = ARTIFACTS_VERSION
+    manifest.setdefault('community', {})
+
+    for keyword in keywords or community_keywords():
+        start = time.perf_counter()
+        entry = build_community(keyword, previous.get('community', {}).get(keyword))
+        manifest['community'][keyword] = entry
+        print(f"community {keyword}: {entry['rows']} rows, {entry['bytes'] / 1024:.0f} KiB, "
+              f"layout {entry['layout']['method']} "
+              f"in {time.perf_counter() - start:.2f}s")
+        write_manifest(manifest)
+
+    start = time.perf_counter()
+    manifest['users'] = entry = build_users()
+    print(f"users: {entry['users']} users in {entry['entries']} classes, {entry['bytes'] / 1024:.0f} KiB "
+          f"in {time.perf_counter() - start:.2f}s")
+    write_manifest(manifest)
+
+    if kruskal:
+        start = time.perf_counter()
+        manifest['kruskal'] = entry = build_kruskal()
+        print(f"kruskal: {len(entry['keywords'])} keywords, {entry['bytes'] / 1024:.0f} KiB "
+              f"in {time.perf_counter() - start:.2f}s")
+        write_manifest(manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('keywords', nargs='*', help='keywords to rebuild, all of them by default')
+    parser.add_argument('--skip-kruskal', action='store_true')
+    args = parser.parse_args()
+    build(args.keywords, kruskal=not args.skip_kruskal)
+
+
+if __name__ == '__main__':
+    main()
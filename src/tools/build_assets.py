@@ -0,0 +1,160 @@
+# Build optimized copies of the files in src/assets.
+# Run from the src folder: python -m tools.build_assets
+#
+# Images get resized variants (WIDTHS, never upscaled) in AVIF, WebP and PNG; stylesheets get a gzip and, when
+# the brotli package is installed, a brotli copy. Every file name carries a hash of its content, so
+# the files can be cached forever by the browsers: a changed asset gets a new name. The files and a
+# manifest.json go to src/asset_build (outside of the assets folder, which Dash serves and includes as is) and
+# are served by the /static-assets route of pages/static_assets.py.
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+
+from PIL import Image, features
+
+from pages.paths import ASSET_BUILD_DIR, ASSETS_DIR
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WIDTHS = [320, 640, 960, 1280, 1920]
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+# only the stylesheets, the pages link their hashed copies. Scripts are included by Dash from assets/ as they are.
+TEXT_EXTENSIONS = ('.css',)
+
+# encoder settings of the image formats, avif only when Pillow was built with it
+FORMATS = {
+    'avif': {'format': 'AVIF', 'quality': 55},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()[:10]
+
+
+def hashed_name(name, data, suffix=''):
+    stem, extension = os.path.splitext(name)
+    stem = stem.replace(' ', '_')
+    return f'{stem}{suffix}.{content_hash(data)}{extension}'
+
+
+def write(folder, name, data):
+    with open(os.path.join(folder, name), 'wb') as f:
+        f.write(data)
+
+
+def build_image(path, folder, formats):
+    with open(path, 'rb') as f:
+        original = f.read()
+    image = Image.open(io.BytesIO(original))
+    image.load()
+    width, height = image.size
+    widths = [w for w in WIDTHS if w < width] + [width]
+
+    variants = {}
+    for image_format in formats:
+        variants[image_format] = []
+        for w in widths:
+            resized = image if w == width else image.resize((w, round(height * w / width)), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, **FORMATS[image_format])
+            data = buffer.getvalue()
+            if image_format == 'png' and w == width and len(original) <= len(data):
+                # the original can already be smaller (palette images)
+                data = original
+            name = f'{os.path.splitext(hashed_name(os.path.basename(path), data, f"-{w}w"))[0]}.{image_format}'
+            write(folder, name, data)
+            variants[image_format].append([w, name, len(data)])
+    return {'source_hash': content_hash(original), 'width': width, 'height': height, 'variants': variants}
+
+
+def reuse(entry, path, folder, formats):
+    # copy the files of an image that did not change since the previous build
+    with open(path, 'rb') as f:
+        if entry is None or entry.get('source_hash') != content_hash(f.read()):
+            return None
+    if sorted(entry['variants']) != sorted(formats):
+        return None
+    names = [name for variants in entry['variants'].values() for _, name, _ in variants]
+    if not all(os.path.exists(os.path.join(ASSET_BUILD_DIR, name)) for name in names):
+        return None
+    for name in names:
+        shutil.copy2(os.path.join(ASSET_BUILD_DIR, name), os.path.join(folder, name))
+    return entry
+
+
+def build_text(path, folder):
+    with open(path, 'rb') as f:
+        data = f.read()
+    name = hashed_name(os.path.basename(path), data)
+    write(folder, name, data)
+
+    compressed = gzip.compress(data, 9, mtime=0)
+    write(folder, f'{name}.gz', compressed)
+    encodings = {'gzip': len(compressed)}
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        write(folder, f'{name}.br', compressed)
+        encodings['br'] = len(compressed)
+    return {'file': name, 'bytes': len(data), 'encodings': encodings}
+
+
+def read_manifest():
+    try:
+        with open(os.path.join(ASSET_BUILD_DIR, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build(force=False):
+    formats = [name for name in FORMATS if name != 'avif' or features.check('avif')]
+    previous = {} if force else read_manifest().get('images', {})
+    tmp_folder = f'{ASSET_BUILD_DIR}.tmp'
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    os.makedirs(tmp_folder)
+
+    manifest = {'images': {}, 'text': {}}
+    for name in sorted(os.listdir(ASSETS_DIR)):
+        path = os.path.join(ASSETS_DIR, name)
+        start = time.perf_counter()
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            entry = reuse(previous.get(name), path, tmp_folder, formats)
+            if entry is not None:
+                manifest['images'][name] = entry
+                print(f"{name}: unchanged")
+                continue
+            manifest['images'][name] = entry = build_image(path, tmp_folder, formats)
+            full_width = {image_format: entry['variants'][image_format][-1][2] for image_format in formats}
+            sizes = ', '.join(f'{image_format} {size / 1024:.0f} KiB' for image_format, size in full_width.items())
+            print(f"{name}: {os.path.getsize(path) / 1024:.0f} KiB -> full width {sizes}, "
+                  f"{len(entry['variants'][formats[0]])} widths in {time.perf_counter() - start:.1f}s")
+        elif name.lower().endswith(TEXT_EXTENSIONS):
+            manifest['text'][name] = entry = build_text(path, tmp_folder)
+            encodings = ', '.join(f'{encoding} {size} B' for encoding, size in entry['encodings'].items())
+            print(f"{name}: {entry['bytes']} B -> {encodings}")
+
+    with open(os.path.join(tmp_folder, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(ASSET_BUILD_DIR, ignore_errors=True)
+    os.rename(tmp_folder, ASSET_BUILD_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='encode the images again even if they did not change')
+    args = parser.parse_args()
+    build(args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# Fill the agreement column (+1 the reply agrees with the post it answers, -1 it disagrees) of a tweet csv.
+# Run from the src folder:
+#   python -m tools.classify_agreement new_tweets.csv --model stand-in|module:factory --output OUT [--workers 4]
+#
+# The column of the community csvs comes from a stance model (RoBERTa-large) that is not part of the repository.
+# Any model plugs in with --model module:factory, where factory() returns an object with a `name` and a
+# `predict(pairs)` method taking a list of (text, originalTweetContent) pairs and returning one +1/-1 per pair.
+# --model stand-in is StandInModel, a small lexical classifier that only stands in for the real model when trying
+# out the pipeline: its labels are not those of the dataset, so it has to be asked for. The labelled csv goes to
+# --output, never over the input file.
+#
+# The csv is read in chunks and every chunk goes through
+#   pair keys -> cache lookup -> length-bucketed batches -> worker pool -> cache
+# A pair is keyed by a hash of the model name and of both texts, so the pairs repeated in a chunk are classified
+# once and the pairs already classified by an earlier run (or an earlier chunk) come from the sqlite cache in the
+# cache folder. The pairs left are sorted by length and cut into batches of similar lengths, so that a model
+# padding its inputs to the longest pair of a batch wastes little, and the batches are split between the
+# processes of a pool, each loading the model once.
+import argparse
+import hashlib
+import importlib
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pages.paths import CACHE_DIR
+
+CHUNK_SIZE = 100_000
+# most pairs in a batch, and most tokens (longest pair of the batch x pairs) when the pairs are long
+BATCH_SIZE = 64
+BATCH_TOKENS = 16_384
+CACHE_PATH = os.path.join(CACHE_DIR, 'agreement.sqlite')
+# sqlite limits the number of parameters of a query
+LOOKUP_SIZE = 900
+
+
+class StandInModel:
+    # Counts agreeing and disagreeing words of the reply: disagreement when there are more disagreeing ones.
+    name = 'stand-in'
+    AGREE = {'yes', 'agree', 'agreed', 'exactly', 'true', 'right', 'correct', 'absolutely', 'amen', 'thank',
+             'thanks', 'support', 'love', 'great', 'well', 'same', 'indeed', 'truth'}
+    DISAGREE = {'no', 'not', "n't", 'never', 'wrong', 'false', 'lie', 'lies', 'liar', 'fake', 'nonsense',
+                'stupid', 'shame', 'disagree', 'ridiculous', 'delusional', 'lol', 'bs', 'idiot', 'hypocrite'}
+    WORD = re.compile(r"n't|[a-z']+")
+
+    def label(self, text):
+        words = self.WORD.findall(text.lower())
+        agree = sum(word in self.AGREE for word in words)
+        disagree = sum(word in self.DISAGREE for word in words)
+        return -1 if disagree > agree else 1
+
+    def predict(self, pairs):
+        return [self.label(text) for text, _ in pairs]
+
+
+def load_model(spec):
+    if spec == 'stand-in':
+        return StandInModel()
+    module, _, factory = spec.partition(':')
+    if not factory:
+        raise ValueError(f"--model is 'stand-in' or module:factory, not {spec!r}")
+    model = getattr(importlib.import_module(module), factory)()
+    if not hasattr(model, 'name'):
+        model.name = spec
+    return model
+
+
+# the model of a process of the pool, loaded once by its initializer
+_model = None
+
+
+def init_worker(spec):
+    global _model
+    _model = load_model(spec)
+
+
+def classify_batch(pairs):
+    return _model.predict(pairs)
+
+
+def pair_keys(model_name, texts, originals):
+    # content hash of every pair, 128 bits are enough to never see two pairs with the same key
+    prefix = model_name.encode() + b'\x1f'
+    return [hashlib.blake2b(prefix + text.encode() + b'\x1f' + original.encode(), digest_size=16).hexdigest()
+            for text, original in zip(texts, originals)]
+
+
+def token_lengths(texts, originals):
+    # about 4 characters per token for English tweets
+    return (texts.str.len().to_numpy() + originals.str.len().to_numpy()) // 4 + 2
+
+
+def length_batches(lengths):
+    # positions of the pairs in batches of similar lengths: sorted by length, a batch ends at BATCH_SIZE pairs or
+    # when the padded batch would go over BATCH_TOKENS
+    order = np.argsort(lengths, kind='stable')
+    batches = []
+    batch = []
+    for position in order:
+        if batch and (len(batch) == BATCH_SIZE or (len(batch) + 1) * lengths[position] > BATCH_TOKENS):
+            batches.append(batch)
+            batch = []
+        batch.append(position)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class AgreementCache:
+    # labels of the pairs already classified, by pair key
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS agreement (key TEXT PRIMARY KEY, label INTEGER)')
+
+    def get(self, keys):
+        labels = {}
+        for start in range(0, len(keys), LOOKUP_SIZE):
+            part = keys[start:start + LOOKUP_SIZE]
+            query = f"SELECT key, label FROM agreement WHERE key IN ({','.join('?' * len(part))})"
+            labels.update(self.connection.execute(query, part))
+        return labels
+
+    def put(self, labels):
+        self.connection.executemany('INSERT OR REPLACE INTO agreement VALUES (?, ?)', labels.items())
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class Classifier:
+
+    def __init__(self, spec='stand-in', workers=0, cache_path=CACHE_PATH):
+        # workers=0 runs the model in this process (e.g. a model on the GPU)
+        self.model = load_model(spec)
+        self.pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(spec,)) if workers else None
+        self.cache = AgreementCache(cache_path) if cache_path else None
+        self.stats = {'pairs': 0, 'unique': 0, 'cached': 0, 'classified': 0, 'model_s': 0.0}
+
+    def classify(self, texts, originals):
+        # +1/-1 of every pair of the two Series
+        texts = texts.fillna('').astype(str).reset_index(drop=True)
+        originals = originals.fillna('').astype(str).reset_index(drop=True)
+        keys = pd.Series(pair_keys(self.model.name, texts, originals))
+        unique = keys.drop_duplicates()
+        labels = self.cache.get(unique.tolist()) if self.cache else {}
+
+        missing = unique[~unique.isin(labels.keys())]
+        positions = missing.index.to_numpy()
+        batches = [positions[batch] for batch in length_batches(token_lengths(texts[positions],
+                                                                              originals[positions]))]
+        pairs = [list(zip(texts[batch], originals[batch])) for batch in batches]
+        start = time.perf_counter()
+        results = self.pool.map(classify_batch, pairs) if self.pool else map(self.model.predict, pairs)
+        new_labels = {}
+        for batch, batch_labels in zip(batches, results):
+            new_labels.update(zip(keys[batch], (int(label) for label in batch_labels)))
+        self.stats['model_s'] += time.perf_counter() - start
+        if self.cache:
+            self.cache.put(new_labels)
+        labels.update(new_labels)
+
+        self.stats['pairs'] += len(keys)
+        self.stats['unique'] += len(unique)
+        self.stats['cached'] += len(unique) - len(missing)
+        self.stats['classified'] += len(missing)
+        return keys.map(labels).astype('int8').to_numpy()
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+        if self.cache:
+            self.cache.close()
+
+
+def classify_csv(path, output, classifier, chunk_size=CHUNK_SIZE):
+    # every column is kept as it is in the file, only agreement is (re)written
+    header = True
+    with open(f'{output}.tmp', 'w', newline='') as f:
+        for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+            chunk['agreement'] = classifier.classify(chunk['text'], chunk['originalTweetContent'])
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+    os.replace(f'{output}.tmp', output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='csv with the text and originalTweetContent columns')
+    parser.add_argument('--model', required=True, help="module:factory of the stance model, or 'stand-in'")
+    parser.add_argument('--workers', type=int, default=0, help='processes running the model, 0 for this one')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--cache', default=CACHE_PATH, help='sqlite cache of the classified pairs')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--output', required=True, help='csv to write, another file than the input')
+    args = parser.parse_args()
+    if os.path.abspath(args.output) == os.path.abspath(args.path):
+        parser.error('--output has to be another file than the input csv')
+
+    classifier = Classifier(args.model, args.workers, None if args.no_cache else args.cache)
+    start = time.perf_counter()
+    try:
+        classify_csv(args.path, args.output, classifier, args.chunk_size)
+    finally:
+        classifier.close()
+    elapsed = time.perf_counter() - start
+    stats = classifier.stats
+    print(f"{stats['pairs']} pairs, {stats['unique']} unique, {stats['cached']} from the cache, "
+          f"{stats['classified']} classified by {classifier.model.name}")
+    print(f"model: {stats['classified'] / max(stats['model_s'], 1e-9):.0f} pairs/s, "
+          f"whole file: {stats['pairs'] / max(elapsed, 1e-9):.0f} pairs/s in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
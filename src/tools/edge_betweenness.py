@@ -0,0 +1,188 @@
+# Compute the edge betweenness of the reply/mention graph of a keyword.
+# Run from the src folder:
+#   python -m tools.edge_betweenness tweets.csv -o pages/data/community_<keyword>.csv
+#                                    [--mode exact|approximate|parallel]
+#
+# The graph has an edge username -> originalUsernamePost for every reply and username -> mentioned user for
+# every mention. Each row of the output gets the betweenness of its username -> originalUsernamePost edge in the
+# `user_edge_bet` column. The pages read `edge_bet` as a value per community pair, so when the rows have
+# SourceModularity/TargetModularity, `edge_bet` is the sum of the betweenness of the distinct user edges between
+# the two communities (NaN for the replies inside a community). With --kruskal the agreement/edge_bet pairs of the
+# keyword are also written into the Kruskal pickle of the Polarization page, which needs the community columns.
+#
+# Modes:
+#   exact        Brandes' algorithm from every node, O(VE)
+#   approximate  Brandes from k sampled source nodes, rescaled by n / k
+#   parallel     the source nodes (all of them, or k sampled ones) are split across a process pool and the
+#                partial betweenness of every chunk is summed
+import argparse
+import os
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+COMMUNITY_COLUMNS = ['SourceModularity', 'TargetModularity']
+
+_graph = None
+
+
+def mentioned_usernames(value):
+    # mentioned_users holds profile urls (https://twitter.com/<name>), possibly several separated by commas
+    if not isinstance(value, str) or not value:
+        return []
+    names = []
+    for url in value.replace('[', '').replace(']', '').replace("'", '').split(','):
+        name = url.strip().rstrip('/').rsplit('/', 1)[-1]
+        if name:
+            names.append(name)
+    return names
+
+
+def build_reply_graph(tweets, mentions=True, directed=True):
+    G = nx.DiGraph() if directed else nx.Graph()
+    replies = tweets[['username', 'originalUsernamePost']].dropna()
+    G.add_edges_from(zip(replies['username'], replies['originalUsernamePost']))
+
+    if mentions and 'mentioned_users' in tweets:
+        for username, mentioned in zip(tweets['username'], tweets['mentioned_users']):
+            G.add_edges_from((username, name) for name in mentioned_usernames(mentioned))
+
+    G.remove_edges_from(nx.selfloop_edges(G))
+    return G
+
+
+def _rescale(betweenness, n, normalized, directed, k):
+    # same scaling as nx.edge_betweenness_centrality, applied to the unnormalized sums of the chunks
+    scale = 1
+    if normalized and n > 1:
+        scale = (1 if directed else 2) / (n * (n - 1))
+    if k is not None:
+        scale *= n / k
+    return {edge: value * scale for edge, value in betweenness.items()}
+
+
+def _init_worker(G):
+    global _graph
+    _graph = G
+
+
+def _partial_betweenness(sources, G=None):
+    # unnormalized betweenness of the shortest paths starting from `sources`
+    G = _graph if G is None else G
+    return nx.edge_betweenness_centrality_subset(G, sources, list(G), normalized=False)
+
+
+def _sum_partials(G, partials):
+    betweenness = dict.fromkeys(G.edges, 0.0)
+    for partial in partials:
+        for edge, value in partial.items():
+            if edge not in betweenness and not G.is_directed():
+                edge = edge[::-1]
+            betweenness[edge] += value
+    return betweenness
+
+
+def edge_betweenness(G, mode='exact', k=None, workers=None, chunks_per_worker=4, normalized=True, seed=42):
+    if mode == 'exact':
+        return nx.edge_betweenness_centrality(G, normalized=normalized)
+    if mode not in ('approximate', 'parallel'):
+        raise ValueError(f"unknown mode {mode!r}")
+
+    sources = list(G)
+    if mode == 'approximate':
+        k = k or 100
+    if k is not None and k < len(sources):
+        # sampled the same way as nx.edge_betweenness_centrality(G, k=k, seed=seed)
+        sources = random.Random(seed).sample(sources, k)
+    else:
+        k = None
+
+    if mode == 'approximate':
+        betweenness = _sum_partials(G, [_partial_betweenness(sources, G)])
+        return _rescale(betweenness, len(G), normalized, G.is_directed(), k)
+
+    workers = workers or os.cpu_count() or 1
+    n_chunks = max(1, min(len(sources), workers * chunks_per_worker))
+    chunks = [sources[i::n_chunks] for i in range(n_chunks)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(G,)) as pool:
+        betweenness = _sum_partials(G, pool.map(_partial_betweenness, chunks))
+    return _rescale(betweenness, len(G), normalized, G.is_directed(), k)
+
+
+def pair_edge_bet(tweets):
+    # edge_bet of the community pair of every row: the sum of user_edge_bet over the distinct user edges between
+    # the two communities
+    rows = tweets.dropna(subset=['user_edge_bet', *COMMUNITY_COLUMNS])
+    rows = rows[rows['SourceModularity'] != rows['TargetModularity']]
+    sums = (rows.drop_duplicates(['username', 'originalUsernamePost'])
+            .groupby(COMMUNITY_COLUMNS)['user_edge_bet'].sum())
+    pairs = pd.MultiIndex.from_arrays([tweets[column] for column in COMMUNITY_COLUMNS])
+    return sums.reindex(pairs).to_numpy()
+
+
+def attach_edge_betweenness(tweets, betweenness, directed=True):
+    # user_edge_bet of the username -> originalUsernamePost edge of every row, and the edge_bet of its community
+    # pair when the rows have one
+    def lookup(username, original):
+        value = betweenness.get((username, original))
+        if value is None and not directed:
+            value = betweenness.get((original, username))
+        return np.nan if value is None else value
+
+    tweets = tweets.copy()
+    tweets['user_edge_bet'] = [lookup(u, o) for u, o in zip(tweets['username'], tweets['originalUsernamePost'])]
+    if all(column in tweets for column in COMMUNITY_COLUMNS):
+        tweets['edge_bet'] = pair_edge_bet(tweets)
+    return tweets
+
+
+def update_kruskal(path, keyword, tweets):
+    with open(path, 'rb') as pickle_file:
+        accademia_della_kruskal = pickle.load(pickle_file)
+    accademia_della_kruskal[keyword] = tweets[['agreement', 'edge_bet']].dropna().reset_index(drop=True)
+    with open(f'{path}.tmp', 'wb') as pickle_file:
+        pickle.dump(accademia_della_kruskal, pickle_file)
+    os.replace(f'{path}.tmp', path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tweets', help='csv with at least username and originalUsernamePost')
+    parser.add_argument('-o', '--output', required=True, help='csv written with the edge_bet column')
+    parser.add_argument('--mode', choices=['exact', 'approximate', 'parallel'], default='exact')
+    parser.add_argument('-k', type=int, help='number of sampled source nodes (approximate and parallel modes)')
+    parser.add_argument('--workers', type=int, help='processes of the parallel mode, all cpus by default')
+    parser.add_argument('--undirected', action='store_true')
+    parser.add_argument('--no-mentions', action='store_true', help='only use reply edges')
+    parser.add_argument('--kruskal', nargs=2, metavar=('PICKLE', 'KEYWORD'),
+                        help='also store agreement/edge_bet of the keyword in this Kruskal pickle')
+    args = parser.parse_args()
+
+    tweets = pd.read_csv(args.tweets)
+    has_communities = all(column in tweets for column in COMMUNITY_COLUMNS)
+    if args.kruskal and not has_communities:
+        parser.error('--kruskal needs the SourceModularity and TargetModularity columns for edge_bet')
+    directed = not args.undirected
+    G = build_reply_graph(tweets, mentions=not args.no_mentions, directed=directed)
+
+    start = time.perf_counter()
+    betweenness = edge_betweenness(G, args.mode, k=args.k, workers=args.workers)
+    print(f"{args.mode} edge betweenness of {G.number_of_nodes()} nodes / {G.number_of_edges()} edges "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    tweets = attach_edge_betweenness(tweets, betweenness, directed=directed)
+    if not has_communities:
+        print('no SourceModularity/TargetModularity columns: only user_edge_bet is written, not edge_bet')
+    tweets.to_csv(args.output, index=False)
+    if args.kruskal:
+        update_kruskal(args.kruskal[0], args.kruskal[1], tweets)
+
+
+if __name__ == '__main__':
+    main()
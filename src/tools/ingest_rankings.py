@@ -0,0 +1,168 @@
+# Rebuild the ranking tables of the pages from raw tweet files.
+# Run from the src folder:
+#   python -m tools.ingest_rankings tweets/*.csv.gz [--method exact|sketch] [--workers 4] [--output-dir DIR]
+#
+# Writes barplottolo.csv (tweets mentioning each keyword), most_actimel.csv (tweets per user) and most_mentos.csv
+# (mentions per user) with the columns the pages read, to the data folder by default. The raw files are csv
+# (optionally compressed) or json lines with the tweet columns of community_<keyword>.csv (text, username,
+# mentioned_users) and are never loaded at once: every file is read in chunks by a generator pipeline
+#   read_chunks -> count_chunk -> Rankings.add
+# and the files are split between the processes of a pool, each returning its Rankings to be merged.
+#
+# --method exact keeps a Counter of every user, which grows with the number of distinct users. --method sketch
+# keeps the CAPACITY users with the most tweets/mentions with Space-Saving (bounded memory, mergeable) and
+# reports min(Space-Saving bound, Count-Min estimate) for them; every user above total / capacity is found.
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from pages.datastore import community_keywords
+from pages.paths import DATA_DIR
+from tools.sketches import CountMin, SpaceSaving
+
+COLUMNS = ['text', 'username', 'mentioned_users']
+CHUNK_SIZE = 100_000
+# users kept by Space-Saving: 100 000 finds every user with more than 0.001% of the tweets (300 of 30 million)
+# in a few tens of MB
+CAPACITY = 100_000
+# rows of the tables, as in the files of the repository
+TOP_KEYWORDS = 7
+TOP_USERS = 10
+# mentioned users are links to their profile (or @handles)
+MENTION_PATTERN = r'(?:twitter\.com/|@)([A-Za-z0-9_]{1,15})'
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    # DataFrames of at most chunk_size tweets with the used columns, compression from the file extension
+    if path.endswith(('.jsonl', '.jsonl.gz', '.json', '.json.gz')):
+        for chunk in pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False):
+            yield chunk.reindex(columns=COLUMNS)
+    else:
+        yield from pd.read_csv(path, usecols=lambda column: column in COLUMNS, dtype=str, chunksize=chunk_size)
+
+
+def count_chunk(chunk, keywords):
+    # exact counts of one chunk
+    text = chunk['text'].fillna('').str.lower() if 'text' in chunk else pd.Series(dtype=str)
+    counts = {
+        'keywords': Counter({keyword: int(text.str.contains(keyword.lower(), regex=False).sum())
+                             for keyword in keywords}),
+        'users': Counter(),
+        'mentions': Counter(),
+    }
+    if 'username' in chunk:
+        counts['users'] = Counter(chunk['username'].dropna().value_counts().to_dict())
+    if 'mentioned_users' in chunk:
+        mentions = chunk['mentioned_users'].dropna().str.findall(MENTION_PATTERN).explode().dropna()
+        counts['mentions'] = Counter(mentions.value_counts().to_dict())
+    return counts
+
+
+class Rankings:
+    # keyword counts are always exact, there are only a few keywords
+
+    def __init__(self, method, capacity=CAPACITY):
+        self.method = method
+        self.keywords = Counter()
+        self.tweets = 0
+        if method == 'exact':
+            self.users = {'users': Counter(), 'mentions': Counter()}
+        else:
+            self.users = {name: (SpaceSaving(capacity), CountMin()) for name in ['users', 'mentions']}
+
+    def add(self, chunk, counts):
+        self.tweets += len(chunk)
+        self.keywords.update(counts['keywords'])
+        for name in ['users', 'mentions']:
+            if self.method == 'exact':
+                self.users[name].update(counts[name])
+            else:
+                heavy_hitters, sketch = self.users[name]
+                heavy_hitters.merge(counts[name])
+                sketch.add(counts[name])
+
+    def merge(self, other):
+        self.tweets += other.tweets
+        self.keywords.update(other.keywords)
+        for name in ['users', 'mentions']:
+            if self.method == 'exact':
+                self.users[name].update(other.users[name])
+            else:
+                self.users[name][0].merge_summary(other.users[name][0])
+                self.users[name][1].merge(other.users[name][1])
+
+    def top_users(self, name, n):
+        # [(user, count)] of the n users with the most tweets or mentions
+        if self.method == 'exact':
+            counts = self.users[name].items()
+        else:
+            heavy_hitters, sketch = self.users[name]
+            candidates = heavy_hitters.top(n * 10)
+            estimates = sketch.estimate([user for user, _, _ in candidates])
+            counts = [(user, int(min(bound, estimate))) for (user, bound, _), estimate in zip(candidates, estimates)]
+        # ties by name, so that both methods give the same tables
+        return sorted(counts, key=lambda item: (-item[1], item[0]))[:n]
+
+
+def ingest_file(path, keywords, method, capacity, chunk_size):
+    # one file through the pipeline, in a process of the pool
+    rankings = Rankings(method, capacity)
+    for chunk in read_chunks(path, chunk_size):
+        rankings.add(chunk, count_chunk(chunk, keywords))
+    return rankings
+
+
+def ingest(paths, keywords, method='sketch', workers=None, capacity=CAPACITY, chunk_size=CHUNK_SIZE):
+    rankings = Rankings(method, capacity)
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(ingest_file, path, keywords, method, capacity, chunk_size) for path in paths]
+        for future in futures:
+            rankings.merge(future.result())
+    return rankings
+
+
+def write_tables(rankings, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    keywords = sorted(rankings.keywords.items(), key=lambda item: (-item[1], item[0]))[:TOP_KEYWORDS]
+    tables = {
+        'barplottolo.csv': pd.DataFrame(keywords, columns=['top_keywords', 'top_occurrences']),
+        'most_actimel.csv': pd.DataFrame(rankings.top_users('users', TOP_USERS),
+                                         columns=['most_active_users', 'value'])[['value', 'most_active_users']],
+        'most_mentos.csv': pd.DataFrame(rankings.top_users('mentions', TOP_USERS),
+                                        columns=['most_mentioned_users', 'value'])[['value', 'most_mentioned_users']],
+    }
+    for name, table in tables.items():
+        # write to a temp file first, the pages may be reading the current one
+        path = os.path.join(output_dir, name)
+        table.to_csv(f'{path}.tmp', index=False)
+        os.replace(f'{path}.tmp', path)
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+', help='raw tweet files (.csv, .csv.gz, .jsonl, ...)')
+    parser.add_argument('--method', choices=['exact', 'sketch'], default='sketch')
+    parser.add_argument('--workers', type=int, default=None, help='processes, one file at a time each')
+    parser.add_argument('--capacity', type=int, default=CAPACITY, help='users kept by Space-Saving')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--keywords', nargs='+', help='keywords to count, those of the community csvs by default')
+    parser.add_argument('--output-dir', default=DATA_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rankings = ingest(args.paths, args.keywords or community_keywords(), args.method, args.workers, args.capacity,
+                      args.chunk_size)
+    elapsed = time.perf_counter() - start
+    for name, table in write_tables(rankings, args.output_dir).items():
+        print(f"{name}: {', '.join(f'{row.iloc[0]} {row.iloc[1]}' for _, row in table.head(3).iterrows())}, ...")
+    print(f"{rankings.tweets} tweets from {len(args.paths)} files in {elapsed:.1f}s "
+          f"({rankings.tweets / max(elapsed, 1e-9):.0f} tweets/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+# Compute the Kruskal-Wallis table of the Polarization page with bootstrap confidence intervals.
+# Run from the src folder: python -m tools.kruskal_stats [--replicates 1000] [--workers 4]
+#
+# H and the p-value compare the edge betweenness of agreement and disagreement edges for every keyword. The
+# interval of H comes from resampling each group with replacement; the replicates run in a process pool. The
+# table is written to kruskal_stats.csv in the artifacts folder (pages/data/artifacts, or DATA_ARTIFACTS_DIR) and is
+# used by the page as long as its source_hash matches the Kruskal data, otherwise the page computes H and p itself
+# (without intervals).
+import argparse
+import os
+import time
+
+from pages.kruskal import STATS_CSV, kruskal_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--replicates', type=int, default=1000)
+    parser.add_argument('--workers', type=int, help='processes used for the bootstrap, all cpus by default')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = kruskal_table(args.replicates, args.workers)
+    os.makedirs(os.path.dirname(STATS_CSV), exist_ok=True)
+    table.to_csv(STATS_CSV, index=False)
+    print(table.drop(columns='source_hash').to_string(index=False))
+    print(f"{args.replicates} bootstrap replicates in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
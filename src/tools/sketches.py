@@ -0,0 +1,80 @@
+# Bounded-memory counters for tools.ingest_rankings. Both are mergeable, so every process of the pool keeps its
+# own and the results are merged at the end.
+import heapq
+
+import numpy as np
+import pandas as pd
+
+# pd.util.hash_array keys (16 characters) of the rows of the Count-Min sketch
+HASH_KEYS = [f'countmin-row-{row:03d}' for row in range(16)]
+
+
+class SpaceSaving:
+    # Space-Saving heavy hitters: at most `capacity` items with an upper bound of their count and the most that
+    # bound can be off by (error). Every item counted more than total / capacity times is kept. Chunks are
+    # counted exactly first and merged in, as in the mergeable summaries of Agarwal et al.
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+
+    def _floor(self):
+        # the count an item that is not kept can have at most
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, counts, errors=None, floor=0, total=None):
+        # add an exact counter (errors=None, floor=0) or another summary
+        errors = errors or {}
+        own_floor = self._floor()
+        merged_counts = {}
+        merged_errors = {}
+        for item in self.counts.keys() | counts.keys():
+            merged_counts[item] = self.counts.get(item, own_floor) + counts.get(item, floor)
+            merged_errors[item] = self.errors.get(item, own_floor) + (errors.get(item, 0) if item in counts else floor)
+
+        kept = heapq.nlargest(self.capacity, merged_counts, key=merged_counts.get)
+        self.counts = {item: merged_counts[item] for item in kept}
+        self.errors = {item: merged_errors[item] for item in kept}
+        self.total += sum(counts.values()) if total is None else total
+
+    def merge_summary(self, other):
+        self.merge(other.counts, other.errors, other._floor(), other.total)
+
+    def top(self, n):
+        # [(item, count upper bound, error)] of the n largest counts
+        items = sorted(self.counts, key=lambda item: (-self.counts[item], str(item)))[:n]
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+
+class CountMin:
+    # Count-Min sketch: depth rows of width counters, an item adds its count to one counter per row and its
+    # estimate is the smallest of them. Never below the true count, above it by at most 2 * total / width
+    # with probability 1 - 2^-depth.
+
+    def __init__(self, width=2 ** 18, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype='int64')
+
+    def _columns(self, items):
+        values = np.asarray(list(items), dtype=object)
+        return [pd.util.hash_array(values, hash_key=HASH_KEYS[row]) % np.uint64(self.width)
+                for row in range(self.depth)]
+
+    def add(self, counts):
+        if not counts:
+            return
+        values = np.fromiter(counts.values(), dtype='int64', count=len(counts))
+        for row, columns in enumerate(self._columns(counts.keys())):
+            np.add.at(self.table[row], columns.astype(np.intp), values)
+
+    def merge(self, other):
+        self.table += other.table
+
+    def estimate(self, items):
+        if not items:
+            return np.zeros(0, dtype='int64')
+        return np.min([self.table[row, columns.astype(np.intp)] for row, columns in enumerate(self._columns(items))],
+                      axis=0)
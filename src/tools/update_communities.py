@@ -0,0 +1,277 @@
+# Add a batch of new tweets to a keyword and update its communities incrementally.
+# Run from the src folder:
+#   python -m tools.update_communities <keyword> new_tweets.csv [--method louvain|label_propagation]
+#
+# The batch needs the tweet columns of community_<keyword>.csv (at least username, originalUsernamePost and
+# agreement). The partition stored in SourceModularity/TargetModularity is the starting point: only the users the
+# batch touches (new users and the users of its rows) and their neighbours are re-optimized, with a warm-started
+# Louvain local-moving phase or label propagation. New users start in a community of their own. Every other user
+# keeps their community.
+#
+# The rows of the csv are relabelled with the new partition. Like in the original data, community_<keyword>.csv
+# only keeps the rows between two communities: the replies inside a community go to inside_<keyword>.csv next
+# to it, and the next update reads them back, so they still count in the graph and return to the csv when their
+# users end up in two communities. edge_bet is a value per community pair: the pairs already in the csv keep it,
+# new pairs get the edge betweenness of the pair in the community graph, scaled to the stored values.
+#
+# Rows without both users are skipped. The csv is written in place and the artifacts of that keyword only are
+# rebuilt, unless the update lowers the modularity or relabels most users of the csv. The Relationships page
+# picks the change up through the csv hash.
+import argparse
+import os
+import random
+import time
+from collections import defaultdict
+
+import networkx as nx
+import pandas as pd
+
+from pages import datastore
+from pages.paths import data_path
+from tools import build_artifacts
+from tools.edge_betweenness import build_reply_graph
+
+REQUIRED_COLUMNS = ['username', 'originalUsernamePost', 'agreement']
+# the csv is not rewritten when more than this share of its users would change community
+RELABEL_LIMIT = 0.5
+
+
+def inside_csv(keyword):
+    # replies between two users of the same community, left out of community_<keyword>.csv
+    return data_path(f'inside_{keyword}.csv')
+
+
+def previous_partition(tweets):
+    partition = {}
+    known = tweets.dropna(subset=['SourceModularity', 'TargetModularity'])
+    partition.update(zip(known['username'], known['SourceModularity'].astype(int)))
+    partition.update(zip(known['originalUsernamePost'], known['TargetModularity'].astype(int)))
+    return partition
+
+
+def movable_nodes(G, partition, batch):
+    # the users the update may move: the new ones, the users of the batch rows and the neighbours of both
+    touched = {node for node in G if node not in partition}
+    touched |= (set(batch['username']) | set(batch['originalUsernamePost'])) & set(G)
+    nodes = set(touched)
+    for node in touched:
+        nodes.update(G[node])
+    return nodes
+
+
+def warm_start_louvain(G, partition, nodes, resolution=1, max_passes=20, seed=42):
+    # Louvain local-moving phase restricted to `nodes`, starting from `partition`.
+    # Moving node u into community c gains k_u,c / m - resolution * tot_c * k_u / (2 m^2).
+    partition = dict(partition)
+    m = G.size(weight='weight')
+    if m == 0:
+        return partition
+
+    degree = dict(G.degree(weight='weight'))
+    totals = defaultdict(float)
+    for node, community in partition.items():
+        totals[community] += degree.get(node, 0)
+
+    order = sorted(nodes, key=str)
+    rng = random.Random(seed)
+    for _ in range(max_passes):
+        rng.shuffle(order)
+        moved = False
+        for node in order:
+            current = partition[node]
+            links = defaultdict(float)
+            for neighbour, data in G[node].items():
+                if neighbour != node:
+                    links[partition[neighbour]] += data.get('weight', 1)
+
+            totals[current] -= degree[node]
+            best = current
+            best_gain = links.get(current, 0) / m - resolution * totals[current] * degree[node] / (2 * m ** 2)
+            for community, weight in links.items():
+                gain = weight / m - resolution * totals[community] * degree[node] / (2 * m ** 2)
+                if gain > best_gain:
+                    best, best_gain = community, gain
+            totals[best] += degree[node]
+
+            if best != current:
+                partition[node] = best
+                moved = True
+        if not moved:
+            break
+    return partition
+
+
+def warm_start_label_propagation(G, partition, nodes, max_passes=20, seed=42):
+    # Asynchronous label propagation restricted to `nodes`, starting from `partition`; ties keep the current label
+    partition = dict(partition)
+    order = sorted(nodes, key=str)
+    rng = random.Random(seed)
+    for _ in range(max_passes):
+        rng.shuffle(order)
+        moved = False
+        for node in order:
+            weights = defaultdict(float)
+            for neighbour, data in G[node].items():
+                if neighbour != node:
+                    weights[partition[neighbour]] += data.get('weight', 1)
+            if not weights:
+                continue
+            top = max(weights.values())
+            if weights.get(partition[node], 0) == top:
+                continue
+            partition[node] = min(community for community, weight in weights.items() if weight == top)
+            moved = True
+        if not moved:
+            break
+    return partition
+
+
+def community_graph(tweets, mentions):
+    # undirected reply graph weighted by the number of interactions between two users
+    directed = build_reply_graph(tweets, mentions=mentions, directed=True)
+    G = nx.Graph()
+    G.add_nodes_from(directed)
+    for u, v in directed.edges:
+        if G.has_edge(u, v):
+            G[u][v]['weight'] += 1
+        else:
+            G.add_edge(u, v, weight=1)
+    return G
+
+
+def modularity(G, partition):
+    communities = defaultdict(set)
+    for node in G:
+        communities[partition[node]].add(node)
+    return nx.community.modularity(G, communities.values())
+
+
+def pair_edge_bet(known, rows):
+    # edge_bet of every community pair of the rows. The pairs of the csv keep their value (the same for all their
+    # rows). A new pair gets the edge betweenness of the pair in the undirected community graph, scaled by the
+    # median ratio between the stored values and the betweenness of the pairs that have both.
+    pairs = rows.groupby(['SourceModularity', 'TargetModularity']).size().index
+    graph = nx.Graph()
+    graph.add_edges_from(pairs)
+    betweenness = nx.edge_betweenness_centrality(graph)
+    computed = pd.Series([betweenness.get(pair, betweenness.get(pair[::-1])) for pair in pairs], index=pairs)
+    shared = computed.index.intersection(known.index)
+    ratios = (known[shared] / computed[shared])[computed[shared] > 0]
+    values = computed * (ratios.median() if len(ratios) else 1)
+    stored = known.reindex(pairs)
+    return stored.fillna(values)
+
+
+def update_communities(tweets, batch, inside=None, method='louvain', mentions=False, seed=42):
+    # tweets: the rows of the csv, inside: the rows of inside_<keyword>.csv. Returns the rows of both files after
+    # the update and a report.
+    missing = [column for column in REQUIRED_COLUMNS if column not in batch]
+    if missing:
+        raise ValueError(f"the batch is missing the columns {missing}, "
+                         f"agreement comes from the stance classification of the replies (tools.classify_agreement)")
+    if inside is None:
+        inside = tweets.iloc[:0]
+    # the users of a row are needed to place it
+    complete = batch[['username', 'originalUsernamePost']].notna().all(axis=1)
+    skipped = int((~complete).sum())
+    batch = batch[complete]
+
+    stored = pd.concat([tweets, inside], ignore_index=True)
+    G = community_graph(pd.concat([stored, batch], ignore_index=True), mentions)
+    previous = previous_partition(stored)
+    partition = dict(previous)
+    next_community = max(partition.values(), default=-1) + 1
+    for node in G:
+        if node not in partition:
+            partition[node] = next_community
+            next_community += 1
+    before = modularity(G, partition)
+
+    nodes = movable_nodes(G, previous, batch)
+    if method == 'louvain':
+        partition = warm_start_louvain(G, partition, nodes, seed=seed)
+    elif method == 'label_propagation':
+        partition = warm_start_label_propagation(G, partition, nodes, seed=seed)
+    else:
+        raise ValueError(f"unknown method {method!r}")
+
+    # every row is labelled with the new partition, the rows of the csv first in their order
+    known = tweets.groupby(['SourceModularity', 'TargetModularity'])['edge_bet'].first()
+    rows = pd.concat([stored, batch], ignore_index=True)
+    source = rows['username'].map(partition)
+    target = rows['originalUsernamePost'].map(partition)
+    covered = source.notna() & target.notna()
+    skipped += int((~covered).sum())
+    rows = rows[covered].assign(SourceModularity=source[covered].astype(int),
+                                TargetModularity=target[covered].astype(int))
+    crossing = rows['SourceModularity'] != rows['TargetModularity']
+    values = pair_edge_bet(known, rows[crossing])
+    pairs = pd.MultiIndex.from_arrays([rows['SourceModularity'], rows['TargetModularity']])
+    rows['edge_bet'] = values.reindex(pairs).to_numpy()
+
+    relabelled = sum(partition.get(node) != community for node, community in previous.items())
+    report = {
+        'placed': len(nodes),
+        'rows': int(crossing.sum()),
+        'added': int(crossing.sum()) - len(tweets),
+        'inside': int((~crossing).sum()),
+        'skipped': skipped,
+        'new_pairs': len(values.index.difference(known.index)),
+        'relabelled': relabelled,
+        'existing': len(previous),
+        'modularity_before': before,
+        'modularity_after': modularity(G, partition),
+    }
+    return rows[crossing].reset_index(drop=True), rows[~crossing].reset_index(drop=True), report
+
+
+def update_problems(report):
+    # reasons not to write the update
+    problems = []
+    if report['modularity_after'] < report['modularity_before'] - 1e-9:
+        problems.append(f"modularity goes down from {report['modularity_before']:.4f} "
+                        f"to {report['modularity_after']:.4f}")
+    if report['existing'] and report['relabelled'] > RELABEL_LIMIT * report['existing']:
+        problems.append(f"{report['relabelled']} of the {report['existing']} users of the csv change community")
+    return problems
+
+
+def write_csv(rows, path):
+    rows.to_csv(f'{path}.tmp', index=False)
+    os.replace(f'{path}.tmp', path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('keyword')
+    parser.add_argument('batch', help='csv of the new tweets of the keyword')
+    parser.add_argument('--method', choices=['louvain', 'label_propagation'], default='louvain')
+    parser.add_argument('--mentions', action='store_true', help='also link users through mentions')
+    parser.add_argument('--skip-artifacts', action='store_true')
+    args = parser.parse_args()
+
+    path = datastore.community_csv(args.keyword)
+    tweets = pd.read_csv(path)
+    inside = pd.read_csv(inside_csv(args.keyword)) if os.path.exists(inside_csv(args.keyword)) else None
+    batch = pd.read_csv(args.batch)
+
+    start = time.perf_counter()
+    updated, inside, report = update_communities(tweets, batch, inside, args.method, args.mentions)
+    print(f"{len(batch)} new rows, {report['placed']} users re-optimized with {args.method} "
+          f"in {time.perf_counter() - start:.2f}s: {report['rows']} rows between communities "
+          f"({report['added']:+d}, {report['new_pairs']} new community pairs), {report['inside']} inside a community, "
+          f"{report['skipped']} skipped without both users, {report['relabelled']} users of the csv relabelled, "
+          f"modularity {report['modularity_before']:.4f} -> {report['modularity_after']:.4f}")
+    problems = update_problems(report)
+    if problems:
+        raise SystemExit(f"{path} left unchanged: {'; '.join(problems)}")
+
+    write_csv(inside, inside_csv(args.keyword))
+    write_csv(updated, path)
+
+    if not args.skip_artifacts:
+        build_artifacts.build([args.keyword], kruskal=False)
+
+
+if __name__ == '__main__':
+    main()